@@ -0,0 +1,105 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import CalendarDatabase
+
+TAGS = [None, 'Work', 'Personal', 'School', 'Family', 'Travel']
+START = date(2015, 1, 1)
+DAYS = 365 * 10
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def create_unindexed_db(path, rows):
+    # Schema exactly as it was before migrations existed (user_version 0)
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            time TEXT,
+            description TEXT NOT NULL,
+            tag TEXT
+        )
+    ''')
+    rng = random.Random(rows)
+
+    def generate():
+        for i in range(rows):
+            day = (START + timedelta(days=rng.randrange(DAYS))).isoformat()
+            event_time = None if rng.random() < 0.3 else f"{rng.randrange(24):02d}:{rng.choice((0, 15, 30, 45)):02d}"
+            yield day, event_time, f"Event {i}", rng.choice(TAGS)
+
+    conn.executemany('INSERT INTO events (date, time, description, tag) VALUES (?, ?, ?, ?)', generate())
+    conn.commit()
+    conn.close()
+
+
+def time_calls(func, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return median(samples)
+
+
+def measure(db, rng):
+    # Grid summaries read the daily_tag_counts rollup, which the events indexes don't
+    # affect, so only the lookups on events themselves are compared
+    days = [(START + timedelta(days=rng.randrange(DAYS))).isoformat() for _ in range(50)]
+    # Deleting a row that doesn't exist costs the same lookup without changing the data
+    deletes = [(day, 'missing', '12:00') for day in days]
+    return {
+        'get_events': time_calls(db.get_events, [(day,) for day in days]),
+        'delete_event': time_calls(db.delete_event, deletes),
+    }
+
+
+def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'calendar.db')
+        create_unindexed_db(path, rows)
+
+        # Later migrations add tables the queries need, so migrate and then drop the
+        # events indexes to time the original access paths
+        db = CalendarDatabase(path)
+        indexes = db.conn.execute('''
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'events' AND sql IS NOT NULL
+        ''').fetchall()
+        with db.conn:
+            for name, _ in indexes:
+                db.conn.execute(f'DROP INDEX "{name}"')
+        before = measure(db, random.Random(1))
+
+        start = time.perf_counter()
+        with db.conn:
+            for _, sql in indexes:
+                db.conn.execute(sql)
+        index_ms = (time.perf_counter() - start) * 1000
+        after = measure(db, random.Random(1))
+        db.close()
+    return before, after, index_ms
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'rows':>10} {'query':<22} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for rows in sizes:
+        before, after, index_ms = run(rows)
+        for name in before:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f"{rows:>10} {name:<22} {before[name]:>10.3f} {after[name]:>10.3f} {speedup:>7.1f}x")
+        print(f"{rows:>10} {'indexing':<22} {'':>10} {index_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+MARKS = ['init', 'window', 'first_paint', 'month_loaded']
+
+
+def child(db_path):
+    # One cold start, timed like main.py, quitting as soon as the first month is drawn
+    started = time.perf_counter()
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, ROOT)
+    from PyQt6.QtWidgets import QApplication
+
+    from calendars import CalendarSet
+    from gui import ModernCalendar, StartupTimer
+
+    app = QApplication(sys.argv[:1])
+    startup = StartupTimer(started, report=False)
+    startup.on_finished = lambda marks: app.quit()
+    window = ModernCalendar(db=CalendarSet([db_path]), startup=startup)
+    app.exec()
+    window.close()
+    print(json.dumps(startup.marks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time GUI cold starts to first paint and first month loaded")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--db', help="Calendar to open, copied first (default: an empty one)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child)
+
+    sys.path.insert(0, ROOT)
+    from database import CalendarDatabase
+
+    samples = {mark: [] for mark in MARKS}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'calendar.db')
+        if args.db:
+            shutil.copy(args.db, db_path)
+        # Migrate up front so no run pays for a schema upgrade
+        CalendarDatabase(db_path).close()
+        for run in range(args.runs + 1):
+            output = subprocess.run([sys.executable, __file__, '--child', db_path],
+                                    capture_output=True, text=True, check=True).stdout
+            marks = json.loads(output.strip().splitlines()[-1])
+            # The first run warms the OS file cache and writes the icon cache
+            if run:
+                for mark in MARKS:
+                    samples[mark].append(marks[mark])
+
+    for mark in MARKS:
+        print(f"{mark:<14} {median(samples[mark]):>8.1f} ms  (min {min(samples[mark]):.1f})")
+
+
+if __name__ == '__main__':
+    main()
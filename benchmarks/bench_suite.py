@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from statistics import median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from database import CalendarDatabase
+from grid_cache import month_grid_range
+from synthetic import DAYS, START, create_database, random_day
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def time_calls(func, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'calls': len(samples),
+        'median_ms': round(median(samples), 4),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 4),
+    }
+
+
+def random_grids(rng, count):
+    grids = []
+    for _ in range(count):
+        day = date.fromisoformat(random_day(rng))
+        start, end = month_grid_range(day.year, day.month)
+        grids.append((start.isoformat(), end.isoformat()))
+    return grids
+
+
+def bench_storage(db, rng):
+    days = [random_day(rng) for _ in range(100)]
+    grids = random_grids(rng, 30)
+    results = {
+        'get_events': time_calls(db.get_events, [(day,) for day in days]),
+        'get_events_page': time_calls(db.get_events_page, [(day,) for day in days]),
+        'get_event_summaries': time_calls(db.get_event_summaries, grids),
+        'get_events_by_month_with_tags': time_calls(db.get_events_by_month_with_tags, grids),
+    }
+
+    adds = [(day, f"Benchmark {i}", '12:00', 'Work') for i, day in enumerate(days)]
+    results['add_event'] = time_calls(db.add_event, adds)
+    results['delete_event'] = time_calls(db.delete_event, [(day, description, event_time)
+                                                           for day, description, event_time, _ in adds])
+
+    db.add_events(days, 'Benchmark by id', '12:00', 'Work')
+    db.cursor.execute("SELECT id FROM events WHERE description = 'Benchmark by id'")
+    ids = [(row[0],) for row in db.cursor.fetchall()]
+    results['delete_event_by_id'] = time_calls(db.delete_event_by_id, ids)
+    return results
+
+
+def bench_render(db, rng):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QDate, QRect
+    from PyQt6.QtGui import QPainter, QPixmap
+    from PyQt6.QtWidgets import QApplication
+
+    from gui import CellRenderCache, CustomCalendarWidget
+
+    app = QApplication.instance() or QApplication([])
+    widget = CustomCalendarWidget()
+    widget.resize(900, 700)
+
+    months = [date.fromisoformat(random_day(rng)) for _ in range(20)]
+
+    def load_month(day):
+        # The app's grid path, minus the worker hop: the summaries query, then handing
+        # them to the widget, which schedules repaints of the changed cells
+        widget.setCurrentPage(day.year, day.month)
+        start_day, end_day = widget.grid_range()
+        widget.set_event_dates(db.get_event_summaries(start_day, end_day))
+
+    results = {'load_month_grid': time_calls(load_month, [(day,) for day in months])}
+
+    cell_width, cell_height = 120, 100
+    pixmap = QPixmap(cell_width * 7, cell_height * 6)
+
+    def paint_grid(cold):
+        if cold:
+            widget.render_cache = CellRenderCache(widget.get_complementary_color)
+        start, _ = month_grid_range(widget.yearShown(), widget.monthShown())
+        first = QDate(start.year, start.month, start.day)
+        painter = QPainter(pixmap)
+        for index in range(42):
+            rect = QRect((index % 7) * cell_width, (index // 7) * cell_height, cell_width, cell_height)
+            widget.paintCell(painter, rect, first.addDays(index))
+        painter.end()
+
+    results['paint_grid_cold'] = time_calls(paint_grid, [(True,)] * 20)
+    results['paint_grid_warm'] = time_calls(paint_grid, [(False,)] * 20)
+    widget.deleteLater()
+    app.processEvents()
+    return results
+
+
+def open_database(rows, data_dir):
+    path = os.path.join(data_dir, f"calendar-{rows}.db")
+    if os.path.exists(path):
+        db = CalendarDatabase(path)
+        if db.cursor.execute('SELECT COUNT(*) FROM events').fetchone()[0] == rows:
+            return db
+        db.close()
+        os.remove(path)
+    return create_database(path, rows)
+
+
+def compare(previous, current, threshold):
+    print(f"\n{'rows':>10} {'benchmark':<30} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    regressions = 0
+    for rows, benchmarks in current['results'].items():
+        for name, result in benchmarks.items():
+            old = previous['results'].get(rows, {}).get(name)
+            if not old or not old['median_ms']:
+                continue
+            change = result['median_ms'] / old['median_ms'] - 1
+            flag = '  REGRESSION' if change > threshold else ''
+            regressions += bool(flag)
+            print(f"{rows:>10} {name:<30} {old['median_ms']:>10.3f} {result['median_ms']:>10.3f} "
+                  f"{change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the calendar storage and render hot paths")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--data-dir', help="Keep generated databases here and reuse them between runs")
+    parser.add_argument('--no-gui', action='store_true', help="Skip the Qt widget benchmarks")
+    parser.add_argument('--compare', help="Previous results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'date_range': [START.isoformat(), DAYS],
+        },
+        'results': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for rows in args.sizes:
+            db = open_database(rows, data_dir)
+            results = bench_storage(db, random.Random(rows))
+            if not args.no_gui:
+                results.update(bench_render(db, random.Random(rows)))
+            db.close()
+            report['results'][str(rows)] = results
+            for name, result in results.items():
+                print(f"{rows:>10} {name:<30} {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:.3f} ms")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(previous, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
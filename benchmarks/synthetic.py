@@ -0,0 +1,40 @@
+import random
+from datetime import date, timedelta
+
+from database import CalendarDatabase
+
+START = date(2022, 1, 1)
+DAYS = 365 * 5
+
+TAGS = [None, 'Work', 'Personal', 'School', 'Family', 'Travel']
+WEEKDAY_TAG_WEIGHTS = [25, 45, 10, 10, 5, 5]
+WEEKEND_TAG_WEIGHTS = [30, 5, 30, 5, 20, 10]
+DESCRIPTIONS = ['Standup', 'Lunch', 'Review', 'Gym', 'Dentist', 'Call mom', 'Flight',
+                'Homework', 'Planning', 'Dinner', 'Groceries', '1:1', 'Demo', 'Deploy']
+
+
+def random_time(rng):
+    # A quarter of events are all-day, the rest cluster around office hours
+    if rng.random() < 0.25:
+        return None
+    hour = min(23, max(0, int(rng.gauss(13, 3.5))))
+    return f"{hour:02d}:{rng.choice((0, 15, 30, 45)):02d}"
+
+
+def generate_events(rows, seed=0):
+    rng = random.Random(seed)
+    for i in range(rows):
+        day = START + timedelta(days=rng.randrange(DAYS))
+        weights = WEEKEND_TAG_WEIGHTS if day.weekday() >= 5 else WEEKDAY_TAG_WEIGHTS
+        tag = rng.choices(TAGS, weights)[0]
+        yield day.isoformat(), random_time(rng), f"{rng.choice(DESCRIPTIONS)} {i}", tag
+
+
+def create_database(path, rows, seed=0):
+    db = CalendarDatabase(path)
+    db.bulk_load(generate_events(rows, seed))
+    return db
+
+
+def random_day(rng):
+    return (START + timedelta(days=rng.randrange(DAYS))).isoformat()
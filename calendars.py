@@ -0,0 +1,232 @@
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import (ALL_DAY, DEFAULT_DAY_END, DEFAULT_DAY_START, CalendarDatabase, busiest_days, common_slots,
+                      day_density, day_number, day_summaries, free_slots, merge_counts, minutes, tag_trend)
+from instrumentation import instrument_methods
+
+# Calendars queried at once, more visible than this take turns
+MAX_PARALLEL = 4
+# Above any event or series id, for paging past every row of a key in one calendar
+_MAX_ID = 2 ** 63 - 1
+
+
+def calendar_name(path):
+    return os.path.splitext(os.path.basename(path))[0] or 'calendar'
+
+
+def _page_key(row):
+    # Per-file sort key of a get_events_page row, the one get_events_page returns as next_key
+    event_id, time, _, _, recurrence_id, _ = row
+    return (ALL_DAY if time is None else minutes(time), 0 if event_id is not None else 1,
+            event_id if event_id is not None else recurrence_id)
+
+
+# Accessors are left out, only queries and writes are worth a histogram
+@instrument_methods('calendars', exclude=('add', 'names', 'path', 'visible', 'set_visible', 'database', 'close'))
+class CalendarSet:
+    # Several calendars, each a database file of its own with its own migrations, full-text
+    # index, span index and rollup. Reads run against every visible calendar in parallel
+    # and the results are merged here, so a huge calendar never slows the queries against
+    # a small one, and a hidden calendar is never even opened. Writes go to one calendar,
+    # the first visible one unless named.
+    # Rows from the event list and search gain the calendar's name as a last field.
+    def __init__(self, paths=('calendar.db',), hidden=(), **options):
+        self._options = options
+        self._paths = {}
+        self._databases = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        for path in paths:
+            self.add(path)
+        hidden = frozenset(name for name in hidden if name in self._paths)
+        # At least one calendar stays visible, new events need somewhere to go
+        self._hidden = hidden if len(hidden) < len(self._paths) else frozenset()
+
+    def add(self, path):
+        # Returns the new calendar's name, the existing one's if the file is already in
+        for name, known in self._paths.items():
+            if os.path.abspath(known) == os.path.abspath(path):
+                return name
+        base = name = calendar_name(path)
+        number = 2
+        while name in self._paths:
+            name = f"{base} {number}"
+            number += 1
+        # Replaced rather than changed, the data worker may be looping over the old one
+        self._paths = {**self._paths, name: path}
+        return name
+
+    def names(self):
+        return list(self._paths)
+
+    def path(self, name):
+        return self._paths[name]
+
+    def visible(self):
+        hidden = self._hidden
+        return [name for name in self._paths if name not in hidden]
+
+    def set_visible(self, name, visible):
+        if visible:
+            self._hidden = self._hidden - {name}
+        elif name in self._paths and len(self.visible()) > 1:
+            self._hidden = self._hidden | {name}
+        else:
+            raise ValueError("At least one calendar has to stay visible")
+
+    def database(self, name=None):
+        # Opened on first use, so hidden calendars cost nothing
+        name = name or self.visible()[0]
+        database = self._databases.get(name)
+        if database is None:
+            with self._lock:
+                database = self._databases.get(name)
+                if database is None:
+                    database = self._databases[name] = CalendarDatabase(self._paths[name], **self._options)
+        return database
+
+    def _call(self, name, method, args, kwargs):
+        return getattr(self.database(name), method)(*args, **kwargs)
+
+    def _map(self, method, *args, **kwargs):
+        # [(name, result)] of the method on every visible calendar
+        return self._map_each(method, {name: args for name in self.visible()}, kwargs)
+
+    def _map_each(self, method, arguments, kwargs=None):
+        # Same with arguments of their own per calendar, {name: args}. Several calendars
+        # run side by side, each database reads through its own connection pool.
+        kwargs = kwargs or {}
+        if len(arguments) == 1:
+            (name, args), = arguments.items()
+            return [(name, self._call(name, method, args, kwargs))]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(MAX_PARALLEL, thread_name_prefix='calendar')
+        futures = [(name, self._pool.submit(self._call, name, method, args, kwargs))
+                   for name, args in arguments.items()]
+        return [(name, future.result()) for name, future in futures]
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown()
+        with self._lock:
+            for database in self._databases.values():
+                database.close()
+            self._databases = {}
+
+    def get_tag_counts(self, start_date, end_date):
+        return merge_counts(counts for _, counts in self._map('get_tag_counts', start_date, end_date))
+
+    def get_event_summaries(self, start_date, end_date):
+        return day_summaries(self.get_tag_counts(start_date, end_date))
+
+    def get_date_summaries(self, dates):
+        return day_summaries(merge_counts(counts for _, counts in self._map('get_date_tag_counts', dates)))
+
+    def get_tag_trend(self, start_date, end_date, period='month'):
+        return tag_trend(self.get_tag_counts(start_date, end_date), day_number(start_date), day_number(end_date),
+                         period)
+
+    def get_busiest_days(self, start_date, end_date, limit=10):
+        return busiest_days(self.get_event_summaries(start_date, end_date), limit)
+
+    def get_day_density(self, start_date, end_date):
+        return day_density(self.get_tag_counts(start_date, end_date), day_number(start_date), day_number(end_date))
+
+    def get_timed_events(self, start_date, end_date):
+        return [row for _, rows in self._map('get_timed_events', start_date, end_date) for row in rows]
+
+    def search_dates(self, text, start_date, end_date):
+        return set().union(*(days for _, days in self._map('search_dates', text, start_date, end_date)))
+
+    def get_busy_times(self, dates, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+        busy = {}
+        for _, times in self._map('get_busy_times', dates, day_start, day_end):
+            for day, spans in times.items():
+                busy.setdefault(day, []).extend(spans)
+        return busy
+
+    def find_conflicts(self, dates, time, end_time=None):
+        rows = [row for _, rows in self._map('find_conflicts', dates, time, end_time) for row in rows]
+        return sorted(rows, key=lambda row: row[:4])
+
+    def find_free_slots(self, dates, duration=60, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+        if duration < 1:
+            raise ValueError(f"Invalid duration {duration}")
+        return free_slots(self.get_busy_times(dates, day_start, day_end), duration, day_start, day_end)
+
+    def find_common_slots(self, dates, duration=60, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+        if duration < 1:
+            raise ValueError(f"Invalid duration {duration}")
+        return common_slots(self.get_busy_times(dates, day_start, day_end), duration, day_start, day_end)
+
+    def search_events(self, text, offset=0, limit=100):
+        # Each calendar ranks its own matches, the lists are merged on (rank, later day first).
+        # BM25 ranks depend on each file's own statistics, so the interleaving is approximate.
+        results = self._map('search_events', text, 0, offset + limit, ranked=True)
+        merged = heapq.merge(*([row + (name,) for row in rows] for name, rows in results),
+                             key=lambda row: (row[7], -row[8]))
+        return [row[:7] + row[9:] for row in list(merged)[offset:offset + limit]]
+
+    def get_events_page(self, date, after=None, limit=200):
+        # Keyset paging like CalendarDatabase.get_events_page, the key being (minutes, kind,
+        # calendar position, id). Every calendar pages from its own place in that order, and
+        # a calendar that filled its page only vouches for rows up to its last one.
+        names = self.names()
+        arguments = {}
+        for name in self.visible():
+            key = None
+            if after is not None:
+                minute, kind, after_position, row_id = after
+                position = names.index(name)
+                if position < after_position:
+                    key = (minute, kind, _MAX_ID)
+                elif position == after_position:
+                    key = (minute, kind, row_id)
+                else:
+                    key = (minute, kind, 0)
+            arguments[name] = (date, key, limit)
+
+        rows = []
+        upper = None
+        for name, (events, next_key) in self._map_each('get_events_page', arguments):
+            position = names.index(name)
+            for event in events:
+                minute, kind, row_id = _page_key(event)
+                rows.append(((minute, kind, position, row_id), event + (name,)))
+            if next_key is not None:
+                last = (next_key[0], next_key[1], position, next_key[2])
+                upper = last if upper is None else min(upper, last)
+
+        rows.sort(key=lambda row: row[0])
+        if upper is not None:
+            rows = [row for row in rows if row[0] <= upper]
+        more = upper is not None or len(rows) > limit
+        rows = rows[:limit]
+        return [event for _, event in rows], rows[-1][0] if more and rows else None
+
+    def add_events(self, dates, description, time=None, tag=None, end_time=None, calendar=None):
+        self.database(calendar).add_events(dates, description, time, tag, end_time)
+
+    def add_recurrences(self, dates, rrule, description, time=None, tag=None, end_time=None, calendar=None):
+        self.database(calendar).add_recurrences(dates, rrule, description, time, tag, end_time)
+
+    def delete_event_by_id(self, event_id, calendar=None):
+        return self.database(calendar).delete_event_by_id(event_id)
+
+    def cancel_occurrence(self, recurrence_id, date, calendar=None):
+        self.database(calendar).cancel_occurrence(recurrence_id, date)
+
+    def get_stats(self):
+        # Totals over the visible calendars, same form as CalendarDatabase.get_stats
+        stats = [stats for _, stats in self._map('get_stats')]
+        tags = merge_counts(entry['tags'] for entry in stats)
+        first_dates = [entry['first_date'] for entry in stats if entry['first_date']]
+        last_dates = [entry['last_date'] for entry in stats if entry['last_date']]
+        return {'events': sum(entry['events'] for entry in stats),
+                'recurrences': sum(entry['recurrences'] for entry in stats),
+                'first_date': min(first_dates, default=None), 'last_date': max(last_dates, default=None),
+                'tags': dict(sorted(tags.items(), key=lambda item: (-item[1], item[0])))}
@@ -0,0 +1,217 @@
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+from database import DEFAULT_DAY_END, DEFAULT_DAY_START, DEFAULT_JOURNAL_MODE, JOURNAL_MODES, CalendarDatabase
+
+# Only database.py is imported up front. Qt is never imported, and export/ical are
+# loaded by the commands that need them, so short scripted calls start fast.
+
+
+def parse_date(value):
+    if value == 'today':
+        return date.today().isoformat()
+    if value == 'tomorrow':
+        return (date.today() + timedelta(days=1)).isoformat()
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date {value}, use YYYY-MM-DD, today or tomorrow")
+
+
+def parse_time(value):
+    parts = value.split(':')
+    if len(parts) != 2 or not all(part.isdigit() for part in parts) or int(parts[0]) > 23 or int(parts[1]) > 59:
+        raise argparse.ArgumentTypeError(f"Invalid time {value}, use HH:MM")
+    return f"{int(parts[0]):02d}:{int(parts[1]):02d}"
+
+
+def format_time(time, end_time=None):
+    return f"{time}-{end_time}" if end_time else time or ''
+
+
+def format_event(date, time, description, tag, ref, end_time=None):
+    line = f"{date}  {format_time(time, end_time):<11}  {description}"
+    if tag:
+        line += f" [{tag}]"
+    return f"{line}  ({ref})"
+
+
+def add_event(db, args):
+    # A double booking is only a warning, scripts still get their event
+    for date, time, end_time, description, _ in db.find_conflicts([args.date], args.time, args.end):
+        print(f"Overlaps {date} {format_time(time, end_time)} {description}", file=sys.stderr)
+    if args.repeat:
+        recurrence_id = db.add_recurrence(args.date, args.repeat, args.description, args.time, args.tag, args.end)
+        print(f"Added series s{recurrence_id} starting {args.date}")
+    else:
+        db.add_event(args.date, args.description, args.time, args.tag, args.end)
+        print(f"Added event on {args.date}")
+
+
+def list_events(db, args):
+    # One-off events stream from the database, occurrences of repeating events are
+    # expanded for the range and merged in
+    start = args.date or args.start or date.today().isoformat()
+    end = args.date or args.end or start
+    rows = [(event_date, time, description, tag, str(event_id), end_time)
+            for event_id, event_date, time, description, tag, end_time in db.iter_events(start, end, args.tag)]
+    rows.extend((occurrence_date, time, description, tag, f"s{recurrence_id}", end_time)
+                for occurrence_date, time, description, tag, recurrence_id, end_time in db.get_occurrences(start, end)
+                if not args.tag or tag == args.tag)
+    rows.sort(key=lambda row: (row[0], row[1] or '99:99'))
+    for row in rows:
+        print(format_event(*row))
+    if not rows:
+        print("No events")
+
+
+def delete_event(db, args):
+    # 12 is an event, s3 a whole series, s3 with --date cancels one occurrence
+    ref = args.ref
+    if ref.startswith('s'):
+        recurrence_id = int(ref[1:])
+        if args.date:
+            db.cancel_occurrence(recurrence_id, args.date)
+            print(f"Cancelled s{recurrence_id} on {args.date}")
+            return 0
+        deleted = db.delete_recurrence(recurrence_id)
+    else:
+        deleted = db.delete_event_by_id(int(ref))
+    if not deleted:
+        print(f"No event {args.ref}", file=sys.stderr)
+        return 1
+    print(f"Deleted {args.ref}")
+
+
+def search_events(db, args):
+    results = db.search_events(args.text, 0, args.limit)
+    for event_id, event_date, time, description, tag, end_time, recurrence_id in results:
+        ref = str(event_id) if recurrence_id is None else f"s{recurrence_id}"
+        print(format_event(event_date, time, description, tag, ref, end_time))
+    if not results:
+        print("No matches")
+
+
+def find_free_time(db, args):
+    # Only events with an end time take up time
+    start = date.fromisoformat(args.date) if args.date else date.today()
+    dates = [(start + timedelta(days=offset)).isoformat() for offset in range(args.days)]
+    if args.together:
+        slots = [(f"{len(dates)} days", start_time, end_time)
+                 for start_time, end_time in db.find_common_slots(dates, args.duration, args.day_start, args.day_end)]
+    else:
+        slots = db.find_free_slots(dates, args.duration, args.day_start, args.day_end)
+    for day, start_time, end_time in slots:
+        print(f"{day}  {start_time}-{end_time}")
+    if not slots:
+        print("No free time")
+
+
+def remind(db, args):
+    # Runs until interrupted, printing each reminder as it falls due
+    import reminders
+
+    print(f"Reminding {args.lead} minutes before timed events, Ctrl+C to stop", file=sys.stderr)
+    try:
+        reminders.run(db, lambda text: print(text, flush=True), args.lead)
+    except KeyboardInterrupt:
+        pass
+
+
+def export_events(db, args):
+    import export
+
+    try:
+        count = export.export_events(db, args.output, args.format, args.start, args.end, args.tag)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Exported {count:,} events to {args.output}")
+
+
+def show_stats(db, args):
+    stats = db.get_stats()
+    print(f"Database:     {os.path.abspath(db.path)} ({os.path.getsize(db.path) / 1e6:.1f} MB)")
+    print(f"Events:       {stats['events']:,}")
+    print(f"Series:       {stats['recurrences']:,}")
+    if stats['first_date']:
+        print(f"Date range:   {stats['first_date']} to {stats['last_date']}")
+    for tag, count in stats['tags'].items():
+        print(f"  {tag:<12}{count:>10,}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description="Manage the calendar without the GUI")
+    parser.add_argument('--db', default='calendar.db', help="Calendar database file")
+    parser.add_argument('--journal-mode', choices=JOURNAL_MODES, default=DEFAULT_JOURNAL_MODE, type=str.upper,
+                        help="SQLite journal mode, DELETE for a calendar on a network share")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('add', help="Add an event")
+    command.add_argument('date', type=parse_date)
+    command.add_argument('description')
+    command.add_argument('--time', type=parse_time)
+    command.add_argument('--end', type=parse_time, help="End time, after --time on the same day")
+    command.add_argument('--tag')
+    command.add_argument('--repeat', metavar='RRULE', help="Repeat rule, e.g. FREQ=WEEKLY or FREQ=MONTHLY;COUNT=6")
+    command.set_defaults(handler=add_event)
+
+    command = commands.add_parser('list', help="List events, today's by default")
+    command.add_argument('date', nargs='?', type=parse_date)
+    command.add_argument('--start', type=parse_date)
+    command.add_argument('--end', type=parse_date)
+    command.add_argument('--tag')
+    command.set_defaults(handler=list_events)
+
+    command = commands.add_parser('delete', help="Delete an event (ID) or a repeating series (sID)")
+    command.add_argument('ref', metavar='ID')
+    command.add_argument('--date', type=parse_date, help="Only cancel this occurrence of a series")
+    command.set_defaults(handler=delete_event)
+
+    command = commands.add_parser('search', help="Full-text search")
+    command.add_argument('text')
+    command.add_argument('--limit', type=int, default=20)
+    command.set_defaults(handler=search_events)
+
+    command = commands.add_parser('free', help="Find free time, for a week from today by default")
+    command.add_argument('date', nargs='?', type=parse_date, help="First day")
+    command.add_argument('--days', type=int, default=7)
+    command.add_argument('--duration', type=int, default=60, help="Minutes")
+    command.add_argument('--from', dest='day_start', type=parse_time, default=DEFAULT_DAY_START)
+    command.add_argument('--to', dest='day_end', type=parse_time, default=DEFAULT_DAY_END)
+    command.add_argument('--together', action='store_true', help="Only times free on every one of the days")
+    command.set_defaults(handler=find_free_time)
+
+    command = commands.add_parser('remind', help="Print reminders for timed events as they fall due")
+    command.add_argument('--lead', type=int, default=10, help="Minutes before the start")
+    command.set_defaults(handler=remind)
+
+    command = commands.add_parser('export', help="Export to ICS, CSV or JSON Lines")
+    command.add_argument('output', help="Destination file, the format follows the extension")
+    command.add_argument('--format', choices=('ics', 'csv', 'jsonl'))
+    command.add_argument('--start', type=parse_date)
+    command.add_argument('--end', type=parse_date)
+    command.add_argument('--tag')
+    command.set_defaults(handler=export_events)
+
+    command = commands.add_parser('stats', help="Show calendar totals")
+    command.set_defaults(handler=show_stats)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = CalendarDatabase(args.db, readers=0, journal_mode=args.journal_mode)
+    try:
+        return args.handler(db, args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import itertools
+import queue
+from functools import partial
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from database import day_number
+from grid_cache import month_grid_range
+from instrumentation import instrumentation
+
+NORMAL_PRIORITY = 0
+# Shutdown runs after every queued normal job, so pending writes still land
+_STOP_PRIORITY = 1
+LOW_PRIORITY = 2
+
+
+class DataJob:
+    def __init__(self, job_id, key, method, args, callback, priority, progress=None, error=None):
+        self.id = job_id
+        self.key = key
+        self.method = method
+        self.args = args
+        self.callback = callback
+        self.priority = priority
+        self.progress = progress
+        self.error = error
+        self.cancelled = False
+
+
+class DataWorker(QThread):
+    job_finished = pyqtSignal(object, object)
+    job_failed = pyqtSignal(object, str)
+    job_progress = pyqtSignal(object, object)
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.jobs = queue.PriorityQueue()
+
+    def run(self):
+        # Reads take a pooled connection of their own, so they run alongside the GUI thread's
+        db = self.db
+        while True:
+            _, _, job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue
+            # method is a CalendarDatabase method name or a function taking the database first
+            if callable(job.method):
+                call = partial(job.method, db)
+            else:
+                call = getattr(db, job.method)
+            kwargs = {}
+            if job.progress:
+                kwargs['progress'] = lambda done, job=job: self.job_progress.emit(job, done)
+            try:
+                result = call(*job.args, **kwargs)
+            except Exception as e:
+                self.job_failed.emit(job, str(e))
+                continue
+            self.job_finished.emit(job, result)
+
+    def submit(self, job):
+        self.jobs.put((job.priority, job.id, job))
+
+    def stop(self):
+        self.jobs.put((_STOP_PRIORITY, 0, None))
+        self.wait()
+
+
+class DataService(QObject):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self._ids = itertools.count(1)
+        self._latest = {}
+        self._db = db
+        self._worker = self._start_worker()
+        # Imports and exports get a worker of their own, started on first use, so grids,
+        # day lists and searches keep flowing while one runs. Under WAL its long
+        # transaction doesn't block their reads.
+        self._bulk_worker = None
+
+    def _start_worker(self):
+        worker = DataWorker(self._db)
+        # Signals emitted from the worker thread are queued onto the GUI thread
+        worker.job_finished.connect(self._on_job_finished)
+        worker.job_failed.connect(self._on_job_failed)
+        worker.job_progress.connect(self._on_job_progress)
+        worker.start()
+        return worker
+
+    def request(self, key, method, *args, callback=None, priority=NORMAL_PRIORITY, progress=None, error=None,
+                bulk=False):
+        # Jobs run in submission order within a priority. A new request with the same key supersedes the
+        # previous one: it is skipped if still queued and its result dropped if running.
+        # Writes use key None so they are never superseded. bulk jobs run on the bulk worker.
+        self.cancel(key)
+        job = DataJob(next(self._ids), key, method, args, callback, priority, progress, error)
+        if key is not None:
+            self._latest[key] = job
+        if bulk:
+            if self._bulk_worker is None:
+                self._bulk_worker = self._start_worker()
+            self._bulk_worker.submit(job)
+        else:
+            self._worker.submit(job)
+        return job
+
+    def cancel(self, key):
+        job = self._latest.pop(key, None)
+        if job:
+            job.cancelled = True
+
+    def _on_job_finished(self, job, result):
+        if job.cancelled:
+            return
+        if self._latest.get(job.key) is job:
+            del self._latest[job.key]
+        if job.callback:
+            job.callback(result)
+
+    def _on_job_progress(self, job, done):
+        if not job.cancelled:
+            job.progress(done)
+
+    def _on_job_failed(self, job, message):
+        if self._latest.get(job.key) is job:
+            del self._latest[job.key]
+        method = getattr(job.method, '__name__', job.method)
+        print(f"Database error in {method}: {message}")
+        if job.error and not job.cancelled:
+            job.error(message)
+
+    def close(self):
+        self._worker.stop()
+        if self._bulk_worker:
+            self._bulk_worker.stop()
+
+
+class MonthPrefetcher(QObject):
+    def __init__(self, service, cache, calendar, delay_ms=200, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.cache = cache
+        self.calendar = calendar
+        self.hits = 0
+        self.misses = 0
+        self._prefetched = set()
+        # Waiting for the user to stop paging keeps prefetch off the busy path
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.prefetch)
+        calendar.currentPageChanged.connect(self.page_changed)
+
+    def page_changed(self, year, month):
+        if (year, month) in self._prefetched:
+            self._prefetched.discard((year, month))
+            if (year, month) in self.cache:
+                self.hits += 1
+                instrumentation.count('prefetch.hit')
+        elif (year, month) not in self.cache:
+            self.misses += 1
+            instrumentation.count('prefetch.miss')
+        self._timer.start()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate()}
+
+    def prefetch(self):
+        year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        for offset in (1, -1):
+            neighbour_year, neighbour_month = divmod(year * 12 + month - 1 + offset, 12)
+            self._load(neighbour_year, neighbour_month + 1)
+
+    def _load(self, year, month):
+        if (year, month) in self.cache:
+            return
+        generation = self.cache.generation
+
+        def loaded(event_dates):
+            self.cache.put(year, month, event_dates, generation)
+            if (year, month) in self.cache:
+                self._prefetched.add((year, month))
+
+        start, end = month_grid_range(year, month)
+        self.service.request(('prefetch', year, month), 'get_event_summaries',
+                             day_number(start), day_number(end),
+                             callback=loaded, priority=LOW_PRIORITY)
@@ -1,65 +1,1138 @@
+import heapq
+import queue
+import re
 import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import date as Date
+from functools import lru_cache, partial
 
+from instrumentation import instrument_methods
+from recurrence import RecurrenceRule
+
+
+def _migrate_v1(cursor):
+    # Day lookups and deletes filter on (date, time), grid summaries group by (date, tag)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_date_time ON events (date, time)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_date_tag ON events (date, tag)')
+
+
+def _migrate_v2(cursor):
+    # A repeating event is one row here however long it runs, until_date is its last
+    # possible occurrence (NULL when endless) so window queries can skip finished series
+    cursor.execute('''
+        CREATE TABLE recurrences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_date TEXT NOT NULL,
+            until_date TEXT,
+            rrule TEXT NOT NULL,
+            time TEXT,
+            description TEXT NOT NULL,
+            tag TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX idx_recurrences_start ON recurrences (start_date)')
+    # Per-occurrence exceptions: cancelled, or with overridden fields (NULL keeps the series value)
+    cursor.execute('''
+        CREATE TABLE recurrence_exceptions (
+            recurrence_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            cancelled INTEGER NOT NULL DEFAULT 0,
+            time TEXT,
+            description TEXT,
+            tag TEXT,
+            PRIMARY KEY (recurrence_id, date)
+        )
+    ''')
+    cursor.execute('CREATE INDEX idx_recurrence_exceptions_date ON recurrence_exceptions (date)')
+
+
+def _migrate_v3(cursor):
+    # Matches the day list ordering so paging through a busy day walks the index
+    cursor.execute("CREATE INDEX idx_events_day_order ON events (date, COALESCE(time, '99:99'))")
+
+
+def _migrate_v4(cursor):
+    # External-content full-text index over descriptions, kept in sync by triggers
+    cursor.execute('''
+        CREATE VIRTUAL TABLE events_fts USING fts5(
+            description, content='events', content_rowid='id'
+        )
+    ''')
+    cursor.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+    for sql in _EVENTS_FTS_TRIGGERS:
+        cursor.execute(sql)
+
+
+_EVENTS_FTS_TRIGGERS = [
+    '''
+        CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, description) VALUES (new.id, new.description);
+        END
+    ''',
+    '''
+        CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        END
+    ''',
+    '''
+        CREATE TRIGGER events_fts_update AFTER UPDATE OF description ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, description) VALUES ('delete', old.id, old.description);
+            INSERT INTO events_fts (rowid, description) VALUES (new.id, new.description);
+        END
+    ''',
+]
+
+
+def _day_sql(column):
+    # 'YYYY-MM-DD' to its Julian day number, julianday() counts from noon
+    return f'CAST(julianday({column}) + 0.5 AS INTEGER)'
+
+
+def _minutes_sql(column):
+    # 'HH:MM' to minutes after midnight, NULL stays NULL
+    return (f"CAST(substr({column}, 1, instr({column}, ':') - 1) AS INTEGER) * 60"
+            f" + CAST(substr({column}, instr({column}, ':') + 1) AS INTEGER)")
+
+
+def _rebuild_table(cursor, table, create_sql, select_sql):
+    # SQLite can't change a column's type: the rows are copied into a new table which then
+    # takes the old one's name. Ids are kept, and so is the AUTOINCREMENT high-water mark.
+    sequence = cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+    cursor.execute(create_sql.format(table=f'{table}_new'))
+    cursor.execute(f'INSERT INTO {table}_new {select_sql}')
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+    if sequence:
+        cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (sequence[0], table))
+
+
+def _migrate_v5(cursor):
+    # Dates become Julian day numbers and times minutes after midnight: rows and indexes
+    # shrink, and range filters and day ordering compare integers instead of strings.
+    # Dropping a table drops its indexes and triggers, so those are created again.
+    _rebuild_table(cursor, 'events', '''
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date INTEGER NOT NULL,
+            time INTEGER,
+            description TEXT NOT NULL,
+            tag TEXT
+        )
+    ''', f'''
+        SELECT id, {_day_sql('date')}, {_minutes_sql('time')}, description, tag FROM events
+    ''')
+    cursor.execute('CREATE INDEX idx_events_date_time ON events (date, time)')
+    cursor.execute('CREATE INDEX idx_events_date_tag ON events (date, tag)')
+    cursor.execute('CREATE INDEX idx_events_day_order ON events (date, COALESCE(time, 1440))')
+    for sql in _EVENTS_FTS_TRIGGERS:
+        cursor.execute(sql)
+
+    _rebuild_table(cursor, 'recurrences', '''
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_date INTEGER NOT NULL,
+            until_date INTEGER,
+            rrule TEXT NOT NULL,
+            time INTEGER,
+            description TEXT NOT NULL,
+            tag TEXT
+        )
+    ''', f'''
+        SELECT id, {_day_sql('start_date')}, {_day_sql('until_date')}, rrule, {_minutes_sql('time')},
+            description, tag
+        FROM recurrences
+    ''')
+    cursor.execute('CREATE INDEX idx_recurrences_start ON recurrences (start_date)')
+
+    _rebuild_table(cursor, 'recurrence_exceptions', '''
+        CREATE TABLE {table} (
+            recurrence_id INTEGER NOT NULL,
+            date INTEGER NOT NULL,
+            cancelled INTEGER NOT NULL DEFAULT 0,
+            time INTEGER,
+            description TEXT,
+            tag TEXT,
+            PRIMARY KEY (recurrence_id, date)
+        )
+    ''', f'''
+        SELECT recurrence_id, {_day_sql('date')}, cancelled, {_minutes_sql('time')}, description, tag
+        FROM recurrence_exceptions
+    ''')
+    cursor.execute('CREATE INDEX idx_recurrence_exceptions_date ON recurrence_exceptions (date)')
+
+
+# Spans in event_spans are minutes since 1970-01-01 (Julian day 2440588)
+SPAN_EPOCH_DAY = 2440588
+
+
+def _span_sql(row):
+    # SQL for the (start, end) span of an events row with an end time
+    return (f'({row}.date - {SPAN_EPOCH_DAY}) * 1440 + {row}.time',
+            f'({row}.date - {SPAN_EPOCH_DAY}) * 1440 + {row}.end_time')
+
+
+def _migrate_v6(cursor):
+    # Optional end times, in minutes on the event's own day. Events that have one are
+    # also kept in an R*Tree of their spans, so overlap checks and free-slot searches
+    # are index lookups instead of comparing events pairwise.
+    cursor.execute('ALTER TABLE events ADD COLUMN end_time INTEGER')
+    cursor.execute('ALTER TABLE recurrences ADD COLUMN end_time INTEGER')
+    cursor.execute('CREATE VIRTUAL TABLE event_spans USING rtree(id, start_minute, end_minute)')
+    start, end = _span_sql('new')
+    cursor.execute(f'''
+        CREATE TRIGGER event_spans_insert AFTER INSERT ON events WHEN new.end_time IS NOT NULL BEGIN
+            INSERT INTO event_spans VALUES (new.id, {start}, {end});
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER event_spans_delete AFTER DELETE ON events WHEN old.end_time IS NOT NULL BEGIN
+            DELETE FROM event_spans WHERE id = old.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER event_spans_update AFTER UPDATE OF date, time, end_time ON events BEGIN
+            DELETE FROM event_spans WHERE id = old.id;
+            INSERT INTO event_spans SELECT new.id, {start}, {end} WHERE new.end_time IS NOT NULL;
+        END
+    ''')
+
+
+def _migrate_v7(cursor):
+    # Event counts per day and tag, kept up to date by triggers, so summaries and statistics
+    # read a row per day and tag instead of every event. Key columns can't be NULL, so
+    # untagged events count under ''.
+    cursor.execute('''
+        CREATE TABLE daily_tag_counts (
+            date INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (date, tag)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("INSERT INTO daily_tag_counts SELECT date, COALESCE(tag, ''), COUNT(*) FROM events GROUP BY 1, 2")
+    for sql in _DAILY_TAG_COUNTS_TRIGGERS:
+        cursor.execute(sql)
+
+
+_COUNT_UP = '''
+    INSERT INTO daily_tag_counts VALUES (new.date, COALESCE(new.tag, ''), 1)
+        ON CONFLICT (date, tag) DO UPDATE SET count = count + 1;
+'''
+# Rows that reach zero go, so the table only ever holds days with events
+_COUNT_DOWN = '''
+    UPDATE daily_tag_counts SET count = count - 1 WHERE date = old.date AND tag = COALESCE(old.tag, '');
+    DELETE FROM daily_tag_counts WHERE date = old.date AND tag = COALESCE(old.tag, '') AND count = 0;
+'''
+_DAILY_TAG_COUNTS_TRIGGERS = [
+    f'CREATE TRIGGER daily_tag_counts_insert AFTER INSERT ON events BEGIN {_COUNT_UP} END',
+    f'CREATE TRIGGER daily_tag_counts_delete AFTER DELETE ON events BEGIN {_COUNT_DOWN} END',
+    f'CREATE TRIGGER daily_tag_counts_update AFTER UPDATE OF date, tag ON events BEGIN {_COUNT_DOWN} {_COUNT_UP} END',
+]
+
+
+def _migrate_v8(cursor):
+    # Repeating series get a full-text index of their own, same form as events_fts, so a
+    # search finds the daily standup as well as one-off events
+    cursor.execute('''
+        CREATE VIRTUAL TABLE recurrences_fts USING fts5(
+            description, content='recurrences', content_rowid='id'
+        )
+    ''')
+    cursor.execute("INSERT INTO recurrences_fts (recurrences_fts) VALUES ('rebuild')")
+    for sql in _RECURRENCES_FTS_TRIGGERS:
+        cursor.execute(sql)
+
+
+_RECURRENCES_FTS_TRIGGERS = [
+    '''
+        CREATE TRIGGER recurrences_fts_insert AFTER INSERT ON recurrences BEGIN
+            INSERT INTO recurrences_fts (rowid, description) VALUES (new.id, new.description);
+        END
+    ''',
+    '''
+        CREATE TRIGGER recurrences_fts_delete AFTER DELETE ON recurrences BEGIN
+            INSERT INTO recurrences_fts (recurrences_fts, rowid, description)
+                VALUES ('delete', old.id, old.description);
+        END
+    ''',
+    '''
+        CREATE TRIGGER recurrences_fts_update AFTER UPDATE OF description ON recurrences BEGIN
+            INSERT INTO recurrences_fts (recurrences_fts, rowid, description)
+                VALUES ('delete', old.id, old.description);
+            INSERT INTO recurrences_fts (rowid, description) VALUES (new.id, new.description);
+        END
+    ''',
+]
+
+
+# MIGRATIONS[n] upgrades a database from user_version n to n + 1
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6, _migrate_v7,
+              _migrate_v8]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# bulk_load suspends the triggers on events, these bring their derived tables up to
+# date afterwards in one pass over the new rows (id >= the first id of the load)
+BULK_LOAD_CATCH_UP = [
+    'INSERT INTO events_fts (rowid, description) SELECT id, description FROM events WHERE id >= ?',
+    'INSERT INTO event_spans SELECT id, {}, {} FROM events WHERE id >= ? AND end_time IS NOT NULL'.format(
+        *_span_sql('events')),
+    '''
+        INSERT INTO daily_tag_counts SELECT date, COALESCE(tag, ''), COUNT(*) FROM events WHERE id >= ? GROUP BY 1, 2
+            ON CONFLICT (date, tag) DO UPDATE SET count = count + excluded.count
+    ''',
+]
+
+
+# Dates are stored as Julian day numbers, the numbers QDate.toJulianDay() gives, and times
+# as minutes after midnight. Methods take dates as ISO strings or day numbers. Rows come
+# back with ISO dates and HH:MM times, day lookups (summaries, search dates) are keyed
+# by day number.
+JULIAN_DAY_OFFSET = 1721425
+# Sort key of events without a time, after every timed one (the 1440 in the SQL below)
+ALL_DAY = 24 * 60
+
+
+def day_number(value):
+    # ISO string or date to a day number, day numbers and None pass through
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = Date.fromisoformat(value)
+    return value.toordinal() + JULIAN_DAY_OFFSET
+
+
+def day_date(number):
+    return Date.fromordinal(number - JULIAN_DAY_OFFSET)
+
+
+@lru_cache(maxsize=4096)
+def iso_date(number):
+    # Cached, exports and day lists format the same few thousand days over and over
+    return None if number is None else day_date(number).isoformat()
+
+
+def minutes(value):
+    # 'HH:MM' (or 'H:M') to minutes after midnight, None and minutes pass through
+    if value is None or isinstance(value, int):
+        return value
+    hours, _, mins = value.partition(':')
+    if not (hours.isdigit() and mins.isdigit() and int(hours) < 24 and int(mins) < 60):
+        raise ValueError(f"Invalid time {value}, use HH:MM")
+    return int(hours) * 60 + int(mins)
+
+
+@lru_cache(maxsize=None)
+def clock(value):
+    return None if value is None else f"{value // 60:02d}:{value % 60:02d}"
+
+
+def event_times(time, end_time=None):
+    # Start and optional end to minutes. An end time needs a start before it on the same day.
+    time, end_time = minutes(time), minutes(end_time)
+    if end_time is not None and (time is None or end_time <= time):
+        raise ValueError("The end time must be after the start time")
+    return time, end_time
+
+
+def _event_row(row):
+    # (id, day, minutes, description, tag, end minutes) from the events table to its public form
+    event_id, day, time, description, tag, end_time = row
+    return event_id, iso_date(day), clock(time), description, tag, clock(end_time)
+
+
+# Hours searched for free time
+DEFAULT_DAY_START = '08:00'
+DEFAULT_DAY_END = '18:00'
+
+
+def _gaps(busy, first, last, duration):
+    # Free (start, end) stretches of at least duration minutes in [first, last) around the
+    # busy (start, end) intervals, which may overlap each other but all overlap the range
+    gaps = []
+    free_from = first
+    for start, end in sorted(busy):
+        if start - free_from >= duration:
+            gaps.append((free_from, start))
+        if end > free_from:
+            free_from = end
+            if free_from >= last:
+                break
+    if last - free_from >= duration:
+        gaps.append((free_from, last))
+    return gaps
+
+
+def fts_query(text):
+    # User text to an FTS5 query: each word quoted (so operators are literal) and prefix-matched
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def day_summaries(tag_counts):
+    # {(day, tag): count} to {day: {'count', 'tag'}}
+    summaries = {}
+    for (date, tag), count in tag_counts.items():
+        summary = summaries.setdefault(date, {'count': 0, 'tag': 'NO TAG', 'tag_count': 0})
+        summary['count'] += count
+        # Dominant tag is the most used one, ties go to the first alphabetically
+        if tag and (count > summary['tag_count'] or
+                    (count == summary['tag_count'] and tag < summary['tag'])):
+            summary['tag'] = tag
+            summary['tag_count'] = count
+
+    for summary in summaries.values():
+        del summary['tag_count']
+    return summaries
+
+
+def merge_counts(results):
+    # Adds up {key: count} dicts, the per-day tag counts of several calendars
+    merged = {}
+    for counts in results:
+        for key, count in counts.items():
+            merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def day_density(tag_counts, start_day, end_day):
+    # Event count and dominant tag of every day of a long range, for the year heatmap:
+    # (counts, tags, tag_names) where counts[i] and tags[i] belong to day start + i and
+    # tags index tag_names, 0 being 'NO TAG'. The counts go straight into two flat arrays,
+    # so a year is a few kilobytes and no per-day objects are built.
+    size = end_day - start_day + 1
+    counts = array('I', [0]) * size
+    tags = array('H', [0]) * size
+    tag_totals = array('I', [0]) * size
+    tag_names = ['NO TAG'] + sorted({tag for _, tag in tag_counts if tag})
+    index = {tag: i for i, tag in enumerate(tag_names)}
+    for (day, tag), count in tag_counts.items():
+        offset = day - start_day
+        counts[offset] += count
+        # Same rule as day_summaries, tag_names is sorted so a lower index wins a tie
+        if tag and (count > tag_totals[offset] or
+                    (count == tag_totals[offset] and index[tag] < tags[offset])):
+            tags[offset] = index[tag]
+            tag_totals[offset] = count
+    return counts, tags, tag_names
+
+
+def tag_trend(tag_counts, start_day, end_day, period='month'):
+    # Events per tag per week (from Monday) or month over the range, for trend charts:
+    # (ISO start of each period, {tag: [count per period]}), untagged as 'NO TAG'
+    if period not in ('week', 'month'):
+        raise ValueError(f"Unknown period {period}, use week or month")
+    if period == 'week':
+        # Julian day 0 was a Monday
+        periods = [day - day % 7 for day in range(start_day, end_day + 1)]
+    else:
+        periods = [day - day_date(day).day + 1 for day in range(start_day, end_day + 1)]
+    starts = sorted(set(periods))
+    index = {start: position for position, start in enumerate(starts)}
+    series = {}
+    for (day, tag), count in tag_counts.items():
+        series.setdefault(tag or 'NO TAG', [0] * len(starts))[index[periods[day - start_day]]] += count
+    return [iso_date(start) for start in starts], dict(sorted(series.items()))
+
+
+def busiest_days(summaries, limit=10):
+    # [(date, count, dominant tag)] of the days with the most events, ties to the earlier day
+    busiest = heapq.nlargest(limit, summaries.items(), key=lambda item: (item[1]['count'], -item[0]))
+    return [(iso_date(day), summary['count'], summary['tag']) for day, summary in busiest]
+
+
+def free_slots(busy, duration, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+    # Free stretches of at least duration minutes between day_start and day_end on each day
+    # of a get_busy_times result, as (date, start, end) rows in order
+    first, last = event_times(day_start, day_end)
+    return [(iso_date(day), clock(start), clock(end))
+            for day in sorted(busy) for start, end in _gaps(busy[day], first, last, duration)]
+
+
+def common_slots(busy, duration, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+    # Times free on every day of a get_busy_times result, for one event added to all of
+    # them: the busy times of every day are laid over a single day. Rows are (start, end).
+    first, last = event_times(day_start, day_end)
+    if not busy:
+        return []
+    spans = [span for day_spans in busy.values() for span in day_spans]
+    return [(clock(start), clock(end)) for start, end in _gaps(spans, first, last, duration)]
+
+
+class ConnectionPool:
+    # Hands out up to size connections, one caller at a time each, opening them on first use
+    def __init__(self, connect, size):
+        self._connect = connect
+        self._size = size
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._connections) < self._size:
+                conn = self._connect()
+                self._connections.append(conn)
+                return conn
+        return self._idle.get()
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_SYNCHRONOUS = 'NORMAL'
+DEFAULT_READERS = 4
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+# WAL needs shared memory between processes, which network filesystems don't provide.
+# DELETE is the fallback for a calendar on a network share, relying on the busy timeout.
+DEFAULT_JOURNAL_MODE = 'WAL'
+JOURNAL_MODES = ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST')
+
+
+@instrument_methods('db')
 class CalendarDatabase:
-    def __init__(self):
+    # Writes go through one connection, serialized by a lock inside the process and by
+    # BEGIN IMMEDIATE across processes. Under WAL, reads use a pool of read-only
+    # connections and never wait for a writer, so every method is safe from any thread.
+    def __init__(self, path='calendar.db', busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS,
+                 synchronous=DEFAULT_SYNCHRONOUS, readers=DEFAULT_READERS, journal_mode=DEFAULT_JOURNAL_MODE):
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown synchronous level {synchronous}, use one of: {', '.join(SYNCHRONOUS_LEVELS)}")
+        journal_mode = journal_mode.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal mode {journal_mode}, use one of: {', '.join(JOURNAL_MODES)}")
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.journal_mode = journal_mode
         self.conn = None
         self.cursor = None
-        self.init_database()
+        self._readers = None
+        self._write_lock = threading.RLock()
+        self.init_database(readers)
         
-    def init_database(self):
+    def _connect(self, read_only=False):
+        # timeout is SQLite's busy handler: wait that long for another process's lock
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        if read_only:
+            conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def init_database(self, readers=DEFAULT_READERS):
         try:
-            self.conn = sqlite3.connect('calendar.db')
+            self.conn = self._connect()
             self.cursor = self.conn.cursor()
+            # The journal mode is stored in the file, so every process opening it gets WAL
+            self.journal_mode = self.cursor.execute(f'PRAGMA journal_mode = {self.journal_mode}').fetchone()[0]
 
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL,
-                    time TEXT,
-                    description TEXT NOT NULL,
-                    tag TEXT
-                )
-            ''')
-            self.conn.commit()
+            with self._transaction():
+                self.cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS events (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        date TEXT NOT NULL,
+                        time TEXT,
+                        description TEXT NOT NULL,
+                        tag TEXT
+                    )
+                ''')
+            self.migrate()
         except sqlite3.Error as e:
             print(f"Database initialization error: {e}")
+
+        # Other journal modes block readers during a commit, and in-memory databases
+        # aren't shared between connections, so those read through the writer
+        if readers and self.journal_mode == 'wal':
+            self._readers = ConnectionPool(partial(self._connect, True), readers)
+
+    @contextmanager
+    def _transaction(self):
+        # Takes the write lock up front, so waiting for another writer happens in the
+        # busy handler instead of failing halfway through the transaction
+        with self._write_lock:
+            self.cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.cursor
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+    @contextmanager
+    def _reading(self):
+        if self._readers is None:
+            with self._write_lock:
+                yield self.conn.cursor()
+            return
+        conn = self._readers.acquire()
+        try:
+            yield conn.cursor()
+        finally:
+            self._readers.release(conn)
+
+    def data_version(self):
+        # Changes whenever another connection, in this process or another, commits. Reading
+        # it touches no table, so long-running readers can notice outside writes cheaply.
+        with self._write_lock:
+            return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def schema_version(self):
+        with self._reading() as cursor:
+            return cursor.execute('PRAGMA user_version').fetchone()[0]
+
+    def migrate(self):
+        # Each step runs in its own transaction so a failed upgrade leaves the file untouched.
+        # The version is read again under the write lock in case another process upgraded first.
+        while self.schema_version() < SCHEMA_VERSION:
+            with self._transaction():
+                version = self.cursor.execute('PRAGMA user_version').fetchone()[0]
+                if version < SCHEMA_VERSION:
+                    MIGRATIONS[version](self.cursor)
+                    self.cursor.execute(f'PRAGMA user_version = {version + 1}')
             
     def close(self):
+        if self._readers:
+            self._readers.close()
         if self.conn:
             self.conn.close()
             
-    def add_event(self, date, description, time=None, tag=None):
-        self.cursor.execute('''
-            INSERT INTO events (date, time, description, tag)
-            VALUES (?, ?, ?, ?)
-        ''', (date, time, description, tag))
-        self.conn.commit()
+    def add_event(self, date, description, time=None, tag=None, end_time=None):
+        time, end_time = event_times(time, end_time)
+        with self._transaction():
+            self.cursor.execute('''
+                INSERT INTO events (date, time, description, tag, end_time)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (day_number(date), time, description, tag, end_time))
+
+    def add_events(self, dates, description, time=None, tag=None, end_time=None):
+        # Same event on many dates in one transaction: either every row is written or none
+        time, end_time = event_times(time, end_time)
+        with self._transaction():
+            self.cursor.executemany('''
+                INSERT INTO events (date, time, description, tag, end_time)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(day_number(date), time, description, tag, end_time) for date in dates])
         
     def delete_event(self, date, description, time=None):
-        if time:
+        with self._transaction():
+            if time:
+                self.cursor.execute('''
+                    DELETE FROM events 
+                    WHERE date = ? AND time = ? AND description = ?
+                ''', (day_number(date), minutes(time), description))
+            else:
+                self.cursor.execute('''
+                    DELETE FROM events 
+                    WHERE date = ? AND description = ? AND time IS NULL
+                ''', (day_number(date), description))
+
+    def delete_event_by_id(self, event_id):
+        with self._transaction():
+            self.cursor.execute('DELETE FROM events WHERE id = ?', (event_id,))
+            return self.cursor.rowcount
+
+    def update_event(self, event_id, date, description, time=None, tag=None, end_time=None):
+        time, end_time = event_times(time, end_time)
+        with self._transaction():
             self.cursor.execute('''
-                DELETE FROM events 
-                WHERE date = ? AND time = ? AND description = ?
-            ''', (date, time, description))
-        else:
+                UPDATE events SET date = ?, time = ?, description = ?, tag = ?, end_time = ?
+                WHERE id = ?
+            ''', (day_number(date), time, description, tag, end_time, event_id))
+
+    def bulk_load(self, rows, batch_size=10000, progress=None):
+        # Loads (date, time, description, tag) rows, optionally with an end time as a fifth
+        # field, from any iterable in one transaction.
+        # Indexes and triggers on events are dropped first and rebuilt once at the end,
+        # which is much cheaper than maintaining them row by row.
+        with self._transaction():
+            self.cursor.execute('''
+                SELECT type, name, sql FROM sqlite_master
+                WHERE type IN ('index', 'trigger') AND tbl_name = 'events' AND sql IS NOT NULL
+            ''')
+            deferred = self.cursor.fetchall()
+            for kind, name, _ in deferred:
+                self.cursor.execute(f'DROP {kind.upper()} "{name}"')
+            first_id = self.cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM events').fetchone()[0]
+
+            total = 0
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    total += self._insert_batch(batch)
+                    batch = []
+                    if progress:
+                        progress(total)
+            if batch:
+                total += self._insert_batch(batch)
+
+            for sql in BULK_LOAD_CATCH_UP:
+                self.cursor.execute(sql, (first_id,))
+            for _, _, sql in deferred:
+                self.cursor.execute(sql)
+        if progress:
+            progress(total)
+        return total
+
+    def _insert_batch(self, batch):
+        rows = []
+        for date, time, description, tag, *end_time in batch:
+            time, end_time = event_times(time, end_time[0] if end_time else None)
+            rows.append((day_number(date), time, description, tag, end_time))
+        self.cursor.executemany('''
+            INSERT INTO events (date, time, description, tag, end_time)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        return len(batch)
+
+    def _recurrence_row(self, rule, date, description, time, tag, end_time):
+        start = day_number(date)
+        last = rule.last_date(day_date(start))
+        time, end_time = event_times(time, end_time)
+        return (start, day_number(last), str(rule), time, description, tag, end_time)
+
+    def add_recurrence(self, date, rrule, description, time=None, tag=None, end_time=None):
+        row = self._recurrence_row(RecurrenceRule.parse(rrule), date, description, time, tag, end_time)
+        with self._transaction():
+            self.cursor.execute('''
+                INSERT INTO recurrences (start_date, until_date, rrule, time, description, tag, end_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', row)
+            return self.cursor.lastrowid
+
+    def add_recurrences(self, dates, rrule, description, time=None, tag=None, end_time=None):
+        rule = RecurrenceRule.parse(rrule)
+        rows = [self._recurrence_row(rule, date, description, time, tag, end_time) for date in dates]
+        with self._transaction():
+            self.cursor.executemany('''
+                INSERT INTO recurrences (start_date, until_date, rrule, time, description, tag, end_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+    def delete_recurrence(self, recurrence_id):
+        with self._transaction():
+            self.cursor.execute('DELETE FROM recurrence_exceptions WHERE recurrence_id = ?', (recurrence_id,))
+            self.cursor.execute('DELETE FROM recurrences WHERE id = ?', (recurrence_id,))
+            return self.cursor.rowcount
+
+    def cancel_occurrence(self, recurrence_id, date):
+        with self._transaction():
             self.cursor.execute('''
-                DELETE FROM events 
-                WHERE date = ? AND description = ? AND time IS NULL
-            ''', (date, description))
-        self.conn.commit()
+                INSERT OR REPLACE INTO recurrence_exceptions (recurrence_id, date, cancelled)
+                VALUES (?, ?, 1)
+            ''', (recurrence_id, day_number(date)))
+
+    def override_occurrence(self, recurrence_id, date, time=None, description=None, tag=None):
+        with self._transaction():
+            self.cursor.execute('''
+                INSERT OR REPLACE INTO recurrence_exceptions (recurrence_id, date, cancelled, time, description, tag)
+                VALUES (?, ?, 0, ?, ?, ?)
+            ''', (recurrence_id, day_number(date), minutes(time), description, tag))
+
+    def get_occurrences(self, start_date, end_date):
+        # (date, time, description, tag, recurrence_id, end_time) for every occurrence in the range
+        with self._reading() as cursor:
+            occurrences = self._occurrences(cursor, day_number(start_date), day_number(end_date))
+        return [(iso_date(day), clock(time), description, tag, recurrence_id, clock(end_time))
+                for day, time, description, tag, recurrence_id, end_time in occurrences]
+
+    def _occurrences(self, cursor, start_day, end_day, match=None):
+        # Expands only the series overlapping the window, and only inside the window, of those
+        # whose description matches the FTS query match when given.
+        # Works in day numbers and minutes throughout.
+        if match is None:
+            cursor.execute('''
+                SELECT id, start_date, until_date, rrule, time, description, tag, end_time FROM recurrences
+                WHERE start_date <= ? AND (until_date IS NULL OR until_date >= ?)
+            ''', (end_day, start_day))
+        else:
+            cursor.execute('''
+                SELECT id, start_date, until_date, rrule, time, description, tag, end_time FROM recurrences
+                WHERE start_date <= ? AND (until_date IS NULL OR until_date >= ?)
+                    AND id IN (SELECT rowid FROM recurrences_fts WHERE recurrences_fts MATCH ?)
+            ''', (end_day, start_day, match))
+        series = cursor.fetchall()
+        if not series:
+            return []
+
+        cursor.execute('''
+            SELECT recurrence_id, date, cancelled, time, description, tag FROM recurrence_exceptions
+            WHERE date >= ? AND date <= ?
+        ''', (start_day, end_day))
+        exceptions = {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+
+        window_start = day_date(start_day)
+        occurrences = []
+        for recurrence_id, first_day, until_day, rrule, time, description, tag, end_time in series:
+            rule = RecurrenceRule.parse(rrule)
+            # until_date also caps COUNT-limited series
+            last = day_date(min(end_day, until_day) if until_day is not None else end_day)
+            for day in rule.between(day_date(first_day), window_start, last):
+                day = day.toordinal() + JULIAN_DAY_OFFSET
+                exception = exceptions.get((recurrence_id, day))
+                if exception:
+                    cancelled, new_time, new_description, new_tag = exception
+                    if cancelled:
+                        continue
+                    if new_time is None:
+                        new_time, new_end = time, end_time
+                    elif end_time is not None:
+                        # A moved occurrence keeps the series' duration, cut off at midnight
+                        new_end = min(new_time + end_time - time, ALL_DAY - 1)
+                        new_end = new_end if new_end > new_time else None
+                    else:
+                        new_end = None
+                    occurrences.append((day, new_time, new_description or description, new_tag or tag,
+                                        recurrence_id, new_end))
+                else:
+                    occurrences.append((day, time, description, tag, recurrence_id, end_time))
+        return occurrences
         
     def get_events(self, date):
-        self.cursor.execute('''
-            SELECT time, description, tag FROM events
-            WHERE date = ?
-            ORDER BY COALESCE(time, '99:99')
-        ''', (date,))
-        return self.cursor.fetchall()
+        # Rows are (id, time, description, tag, recurrence_id, end_time). Occurrences of a
+        # repeating event have no id of their own, one-off events have no recurrence_id.
+        day = day_number(date)
+        with self._reading() as cursor:
+            cursor.execute('''
+                SELECT id, time, description, tag, NULL, end_time FROM events
+                WHERE date = ?
+                ORDER BY COALESCE(time, 1440)
+            ''', (day,))
+            events = cursor.fetchall()
+            occurrences = [(None,) + occurrence[1:] for occurrence in self._occurrences(cursor, day, day)]
+
+        if occurrences:
+            events = sorted(events + occurrences, key=lambda event: ALL_DAY if event[1] is None else event[1])
+        return [(event_id, clock(time), description, tag, recurrence_id, clock(end_time))
+                for event_id, time, description, tag, recurrence_id, end_time in events]
     
+    def get_events_page(self, date, after=None, limit=200):
+        # Keyset paging over the same order as get_events. Rows sort by (minutes, kind, id),
+        # kind 0 for events and 1 for occurrences. after is the key of the last row
+        # already seen, the returned key is None once the day is exhausted.
+        day = day_number(date)
+        with self._reading() as cursor:
+            if after is None:
+                cursor.execute('''
+                    SELECT id, time, description, tag, NULL, end_time FROM events
+                    WHERE date = ?
+                    ORDER BY COALESCE(time, 1440), id
+                    LIMIT ?
+                ''', (day, limit))
+            elif after[1] == 0:
+                cursor.execute('''
+                    SELECT id, time, description, tag, NULL, end_time FROM events
+                    WHERE date = ? AND COALESCE(time, 1440) >= ?
+                        AND (COALESCE(time, 1440), id) > (?, ?)
+                    ORDER BY COALESCE(time, 1440), id
+                    LIMIT ?
+                ''', (day, after[0], after[0], after[2], limit))
+            else:
+                # Events sort before occurrences at the same time, so those were all seen
+                cursor.execute('''
+                    SELECT id, time, description, tag, NULL, end_time FROM events
+                    WHERE date = ? AND COALESCE(time, 1440) > ?
+                    ORDER BY COALESCE(time, 1440), id
+                    LIMIT ?
+                ''', (day, after[0], limit))
+            events = cursor.fetchall()
+            occurrences = self._occurrences(cursor, day, day)
+        rows = [((ALL_DAY if event[1] is None else event[1], 0, event[0]), event) for event in events]
+        full_page = len(rows) == limit
+
+        # Occurrences are few per day, so each page takes the ones inside its key range
+        upper = rows[-1][0] if full_page else None
+        for occurrence in occurrences:
+            key = (ALL_DAY if occurrence[1] is None else occurrence[1], 1, occurrence[4])
+            if (after is None or key > after) and (upper is None or key < upper):
+                rows.append((key, (None,) + occurrence[1:]))
+        rows.sort(key=lambda row: row[0])
+
+        next_key = rows[-1][0] if full_page else None
+        return [(event_id, clock(time), description, tag, recurrence_id, clock(end_time))
+                for _, (event_id, time, description, tag, recurrence_id, end_time) in rows], next_key
+
+    def iter_events(self, start_date=None, end_date=None, tag=None, chunk_size=1000):
+        # Streams (id, date, time, description, tag, end_time) in date order through a dedicated
+        # cursor, holding at most one chunk of rows in memory
+        conditions = []
+        params = []
+        if start_date:
+            conditions.append('date >= ?')
+            params.append(day_number(start_date))
+        if end_date:
+            conditions.append('date <= ?')
+            params.append(day_number(end_date))
+        if tag:
+            conditions.append('tag = ?')
+            params.append(tag)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        if self._readers is None:
+            # Reads share the writer's lock without a reader pool. Each chunk is a query of
+            # its own, paged on from the last row, so the lock is free between chunks and a
+            # long export doesn't hold up every other read and write on the calendar.
+            conditions.append('(date, COALESCE(time, 1440), id) > (?, ?, ?)')
+            where = f"WHERE {' AND '.join(conditions)}"
+            after = (-1, -1, -1)
+            while True:
+                with self._reading() as cursor:
+                    rows = cursor.execute(f'''
+                        SELECT id, date, time, description, tag, end_time FROM events
+                        {where}
+                        ORDER BY date, COALESCE(time, 1440), id
+                        LIMIT ?
+                    ''', params + list(after) + [chunk_size]).fetchall()
+                yield from map(_event_row, rows)
+                if len(rows) < chunk_size:
+                    return
+                event_id, date, time = rows[-1][:3]
+                after = (date, ALL_DAY if time is None else time, event_id)
+
+        with self._reading() as cursor:
+            try:
+                cursor.execute(f'''
+                    SELECT id, date, time, description, tag, end_time FROM events
+                    {where}
+                    ORDER BY date, COALESCE(time, 1440), id
+                ''', params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from map(_event_row, rows)
+            finally:
+                cursor.close()
+
+    def get_recurrences(self, start_date=None, end_date=None, tag=None):
+        # Series overlapping the range as (id, start_date, rrule, time, description, tag, exceptions,
+        # end_time), exceptions being (date, cancelled, time, description, tag) rows
+        start_day, end_day = day_number(start_date), day_number(end_date)
+        recurrences = []
+        with self._reading() as cursor:
+            cursor.execute('''
+                SELECT id, start_date, rrule, time, description, tag, end_time FROM recurrences
+                WHERE (? IS NULL OR start_date <= ?)
+                    AND (? IS NULL OR until_date IS NULL OR until_date >= ?)
+                    AND (? IS NULL OR tag = ?)
+                ORDER BY start_date, id
+            ''', (end_day, end_day, start_day, start_day, tag, tag))
+            series = cursor.fetchall()
+
+            for recurrence_id, first_day, rrule, time, description, tag, end_time in series:
+                cursor.execute('''
+                    SELECT date, cancelled, time, description, tag FROM recurrence_exceptions
+                    WHERE recurrence_id = ?
+                    ORDER BY date
+                ''', (recurrence_id,))
+                exceptions = [(iso_date(day), cancelled, clock(new_time), new_description, new_tag)
+                              for day, cancelled, new_time, new_description, new_tag in cursor.fetchall()]
+                recurrences.append((recurrence_id, iso_date(first_day), rrule, clock(time), description, tag,
+                                    exceptions, clock(end_time)))
+        return recurrences
+
+    def search_events(self, text, offset=0, limit=100, ranked=False):
+        # Ranked full-text search over events and repeating series, every word matches as a
+        # prefix. Rows are (id, date, time, description, tag, end_time, recurrence_id), best
+        # match first, with the match's rank and day number appended when ranked, for merging
+        # result lists. A series is one row on its first date, with no id of its own.
+        # The two indexes rank by their own statistics, so the interleaving is approximate.
+        query = fts_query(text)
+        if not query:
+            return []
+        with self._reading() as cursor:
+            cursor.execute('''
+                SELECT events.id, events.date, events.time, events.description, events.tag, events.end_time,
+                    NULL, events_fts.rank
+                FROM events_fts JOIN events ON events.id = events_fts.rowid
+                WHERE events_fts MATCH ?
+                ORDER BY events_fts.rank, events.date DESC
+                LIMIT ?
+            ''', (query, offset + limit))
+            events = cursor.fetchall()
+            cursor.execute('''
+                SELECT NULL, recurrences.start_date, recurrences.time, recurrences.description, recurrences.tag,
+                    recurrences.end_time, recurrences.id, recurrences_fts.rank
+                FROM recurrences_fts JOIN recurrences ON recurrences.id = recurrences_fts.rowid
+                WHERE recurrences_fts MATCH ?
+                ORDER BY recurrences_fts.rank, recurrences.start_date DESC
+                LIMIT ?
+            ''', (query, offset + limit))
+            series = cursor.fetchall()
+        rows = list(heapq.merge(events, series, key=lambda row: (row[7], -row[1])))[offset:offset + limit]
+        if ranked:
+            return [_event_row(row[:6]) + (row[6], row[7], row[1]) for row in rows]
+        return [_event_row(row[:6]) + (row[6],) for row in rows]
+
+    def search_dates(self, text, start_date, end_date):
+        # Day numbers in the range with at least one match, for highlighting the grid.
+        # Matching series count on the days they occur.
+        query = fts_query(text)
+        if not query:
+            return set()
+        start_day, end_day = day_number(start_date), day_number(end_date)
+        with self._reading() as cursor:
+            cursor.execute('''
+                SELECT DISTINCT date FROM events
+                WHERE id IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)
+                    AND date >= ? AND date <= ?
+            ''', (query, start_day, end_day))
+            days = {row[0] for row in cursor.fetchall()}
+            days.update(occurrence[0] for occurrence in self._occurrences(cursor, start_day, end_day, query))
+        return days
+
+    def get_stats(self):
+        # Totals for the whole calendar: {'events', 'recurrences', 'first_date', 'last_date', 'tags'}
+        with self._reading() as cursor:
+            first_day, last_day = cursor.execute('SELECT MIN(date), MAX(date) FROM daily_tag_counts').fetchone()
+            recurrences = cursor.execute('SELECT COUNT(*) FROM recurrences').fetchone()[0]
+            tags = dict(cursor.execute('''
+                SELECT COALESCE(NULLIF(tag, ''), 'NO TAG'), SUM(count) FROM daily_tag_counts
+                GROUP BY 1 ORDER BY 2 DESC, 1
+            ''').fetchall())
+        return {'events': sum(tags.values()), 'recurrences': recurrences, 'first_date': iso_date(first_day),
+                'last_date': iso_date(last_day), 'tags': tags}
+
     def get_events_by_month_with_tags(self, start_date, end_date):
-        self.cursor.execute('''
-            SELECT DISTINCT date, COALESCE(tag, 'personal') as tag FROM events 
+        with self._reading() as cursor:
+            cursor.execute('''
+                SELECT DISTINCT date, COALESCE(tag, 'personal') as tag FROM events 
+                WHERE date >= ? AND date <= ?
+            ''', (day_number(start_date), day_number(end_date)))
+            return [(iso_date(day), tag) for day, tag in cursor.fetchall()]
+
+    def _day_tag_counts(self, cursor, start_day, end_day):
+        # {(day, tag): count} for the range, read from the daily_tag_counts rollup rather
+        # than the events themselves, plus the occurrences of repeating series
+        cursor.execute('''
+            SELECT date, NULLIF(tag, ''), count FROM daily_tag_counts
             WHERE date >= ? AND date <= ?
-        ''', (start_date, end_date))
-        return self.cursor.fetchall()
-    
\ No newline at end of file
+        ''', (start_day, end_day))
+        tag_counts = {(day, tag): count for day, tag, count in cursor.fetchall()}
+
+        for day, _, _, tag, _, _ in self._occurrences(cursor, start_day, end_day):
+            tag_counts[(day, tag)] = tag_counts.get((day, tag), 0) + 1
+        return tag_counts
+
+    def get_tag_counts(self, start_date, end_date):
+        # {(day number, tag): count} for the range, tag None for untagged events. The raw
+        # form of the summaries below, which several calendars' counts can be added up in.
+        with self._reading() as cursor:
+            return self._day_tag_counts(cursor, day_number(start_date), day_number(end_date))
+
+    def get_event_summaries(self, start_date, end_date):
+        # {day number: {'count', 'tag'}} for the whole range
+        return day_summaries(self.get_tag_counts(start_date, end_date))
+
+    def get_tag_trend(self, start_date, end_date, period='month'):
+        return tag_trend(self.get_tag_counts(start_date, end_date), day_number(start_date), day_number(end_date),
+                         period)
+
+    def get_busiest_days(self, start_date, end_date, limit=10):
+        return busiest_days(self.get_event_summaries(start_date, end_date), limit)
+
+    def get_timed_events(self, start_date, end_date):
+        # (day, time, description, tag) of every event and occurrence with a time in the
+        # range, as day numbers and minutes, for the reminder scheduler
+        start_day, end_day = day_number(start_date), day_number(end_date)
+        with self._reading() as cursor:
+            cursor.execute('''
+                SELECT date, time, description, tag FROM events
+                WHERE date >= ? AND date <= ? AND time IS NOT NULL
+            ''', (start_day, end_day))
+            rows = cursor.fetchall()
+            rows.extend((day, time, description, tag)
+                        for day, time, description, tag, _, _ in self._occurrences(cursor, start_day, end_day)
+                        if time is not None)
+        return rows
+
+    def get_day_density(self, start_date, end_date):
+        return day_density(self.get_tag_counts(start_date, end_date), day_number(start_date), day_number(end_date))
+
+    def get_date_tag_counts(self, dates):
+        # Same as get_tag_counts for scattered days, the ones a write just touched
+        days = sorted({day_number(date) for date in dates})
+        if not days:
+            return {}
+        wanted = set(days)
+        with self._reading() as cursor:
+            cursor.execute(f'''
+                SELECT date, NULLIF(tag, ''), count FROM daily_tag_counts
+                WHERE date IN ({', '.join('?' * len(days))})
+            ''', days)
+            tag_counts = {(day, tag): count for day, tag, count in cursor.fetchall()}
+
+            for day, _, _, tag, _, _ in self._occurrences(cursor, days[0], days[-1]):
+                if day in wanted:
+                    tag_counts[(day, tag)] = tag_counts.get((day, tag), 0) + 1
+        return tag_counts
+
+    def get_date_summaries(self, dates):
+        return day_summaries(self.get_date_tag_counts(dates))
+
+    def _busy(self, cursor, days, start, end, details=False):
+        # Events and occurrences with an end time overlapping minutes [start, end) of each of
+        # the sorted days, as {day: [(start, end), ...]}, plus description and tag with details.
+        # Each day is one R*Tree search; its boxes are single precision, so the exact columns
+        # are checked too.
+        columns = 'events.time, events.end_time' + (', events.description, events.tag' if details else '')
+        busy = {}
+        for day in days:
+            offset = (day - SPAN_EPOCH_DAY) * 1440
+            cursor.execute(f'''
+                SELECT {columns}
+                FROM event_spans JOIN events ON events.id = event_spans.id
+                WHERE event_spans.start_minute < ? AND event_spans.end_minute > ?
+                    AND +events.date = ? AND events.time < ? AND events.end_time > ?
+            ''', (offset + end, offset + start, day, end, start))
+            busy[day] = cursor.fetchall()
+
+        for day, time, description, tag, _, end_time in self._occurrences(cursor, days[0], days[-1]):
+            if end_time is not None and day in busy and time < end and end_time > start:
+                busy[day].append((time, end_time, description, tag) if details else (time, end_time))
+        return busy
+
+    def find_conflicts(self, dates, time, end_time=None):
+        # Events overlapping time to end_time on any of the dates, as (date, time, end_time,
+        # description, tag) rows in order. Only events with an end time take up time; a new
+        # event without one clashes with whatever spans its start.
+        start, end = event_times(time, end_time)
+        days = sorted({day_number(date) for date in dates})
+        if start is None or not days:
+            return []
+        with self._reading() as cursor:
+            busy = self._busy(cursor, days, start, end if end is not None else start + 1, details=True)
+        return [(iso_date(day), clock(start), clock(end), description, tag)
+                for day in days for start, end, description, tag in sorted(busy[day])]
+
+    def get_busy_times(self, dates, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+        # {day number: [(start, end), ...]} of the time taken between day_start and day_end
+        # on each of the dates, in minutes, the input of free_slots and common_slots
+        first, last = event_times(day_start, day_end)
+        days = sorted({day_number(date) for date in dates})
+        if not days:
+            return {}
+        with self._reading() as cursor:
+            return self._busy(cursor, days, first, last)
+
+    def find_free_slots(self, dates, duration=60, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+        if duration < 1:
+            raise ValueError(f"Invalid duration {duration}")
+        return free_slots(self.get_busy_times(dates, day_start, day_end), duration, day_start, day_end)
+
+    def find_common_slots(self, dates, duration=60, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+        if duration < 1:
+            raise ValueError(f"Invalid duration {duration}")
+        return common_slots(self.get_busy_times(dates, day_start, day_end), duration, day_start, day_end)
@@ -0,0 +1,101 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from time import perf_counter
+
+import ical
+from instrumentation import instrumentation
+
+FORMATS = ('ics', 'csv', 'jsonl')
+PROGRESS_EVERY = 10000
+
+
+def format_for_path(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'json':
+        extension = 'jsonl'
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown export format for {path}, use one of: {', '.join(FORMATS)}")
+    return extension
+
+
+def _counted(events, progress):
+    count = 0
+    for event in events:
+        yield event
+        count += 1
+        if progress and count % PROGRESS_EVERY == 0:
+            progress(count)
+
+
+def export_events(db, path, fmt=None, start_date=None, end_date=None, tag=None, progress=None):
+    # Rows stream from the database cursor straight into the file, so memory stays flat
+    # whatever the size of the calendar. Only ICS can describe repeating series, the
+    # flat formats hold one-off events.
+    fmt = fmt or format_for_path(path)
+    started = perf_counter()
+    events = db.iter_events(start_date, end_date, tag)
+
+    if fmt == 'ics':
+        recurrences = db.get_recurrences(start_date, end_date, tag)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            count = ical.write_ics(f, events, recurrences, progress, PROGRESS_EVERY)
+
+    elif fmt == 'csv':
+        count = 0
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'date', 'time', 'description', 'tag', 'end_time'])
+            for event in _counted(events, progress):
+                writer.writerow(event)
+                count += 1
+
+    elif fmt == 'jsonl':
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for event_id, date, time, description, tag, end_time in _counted(events, progress):
+                f.write(json.dumps({'id': event_id, 'date': date, 'time': time, 'end_time': end_time,
+                                    'description': description, 'tag': tag}) + '\n')
+                count += 1
+
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    if progress:
+        progress(count)
+    # Timed here, iter_events only streams its rows once the file is being written
+    if instrumentation.enabled:
+        instrumentation.record(f'export.{fmt}', (perf_counter() - started) * 1000, count)
+    return count
+
+
+def add_arguments(parser):
+    parser.add_argument('output', help="Destination file, the format follows the extension")
+    parser.add_argument('--format', choices=FORMATS, help="Override the format implied by the extension")
+    parser.add_argument('--start', help="First date to include (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Last date to include (YYYY-MM-DD)")
+    parser.add_argument('--tag', help="Only export events with this tag")
+
+
+def main(argv=None):
+    from database import CalendarDatabase
+
+    parser = argparse.ArgumentParser(description="Export calendar events to ICS, CSV or JSON Lines")
+    parser.add_argument('--db', default='calendar.db', help="Calendar database file")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db = CalendarDatabase(args.db)
+    try:
+        count = export_events(db, args.output, args.format, args.start, args.end, args.tag)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+    print(f"Exported {count:,} events to {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from database import day_number
+
+
+def month_grid_range(year, month):
+    # The calendar shows 6 weeks starting on the Monday before the 1st. Like QCalendarWidget,
+    # a month starting on a Monday gets a whole leading week of the previous month.
+    first_day = date(year, month, 1)
+    first_day -= timedelta(days=first_day.weekday() or 7)
+    return first_day, first_day + timedelta(days=41)
+
+
+class MonthGridCache:
+    def __init__(self, capacity=12):
+        self.capacity = capacity
+        self.generation = 0
+        self._months = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._months
+
+    def get(self, year, month):
+        summaries = self._months.get((year, month))
+        if summaries is not None:
+            self._months.move_to_end((year, month))
+        return summaries
+
+    def put(self, year, month, summaries, generation=None):
+        # A result loaded before the latest invalidation may be missing that write
+        if generation is not None and generation != self.generation:
+            return
+        self._months[(year, month)] = summaries
+        self._months.move_to_end((year, month))
+        while len(self._months) > self.capacity:
+            self._months.popitem(last=False)
+
+    def invalidate_dates(self, dates):
+        self.generation += 1
+        days = [day_number(day) for day in dates]
+        for year, month in list(self._months):
+            start, end = month_grid_range(year, month)
+            start, end = day_number(start), day_number(end)
+            if any(start <= day <= end for day in days):
+                del self._months[(year, month)]
+
+    def clear(self):
+        self.generation += 1
+        self._months.clear()
@@ -1,12 +1,28 @@
+import os
+import time
+import zlib
+from array import array
+from collections import OrderedDict
 from datetime import datetime
-from PyQt6.QtSvg import QSvgRenderer
-from PyQt6.QtWidgets import QComboBox
-from database import CalendarDatabase
-from PyQt6.QtCore import Qt, QSize, QByteArray, QDate
-from PyQt6.QtGui import QIcon, QPainter, QPixmap, QColor
+from functools import partial, wraps
+from PyQt6.QtWidgets import (QComboBox, QFileDialog, QMessageBox, QMenu, QDialog, QFormLayout, QCheckBox,
+                             QDateEdit, QDialogButtonBox)
+import ical
+import export
+from calendars import CalendarSet
+from database import clock, day_number, event_times, fts_query, iso_date, minutes
+from data_service import LOW_PRIORITY, DataService, MonthPrefetcher
+from grid_cache import MonthGridCache, month_grid_range
+from instrumentation import instrumentation
+from reminders import ReminderQueue, format_reminder
+from styles import STYLESHEET
+from PyQt6.QtCore import (Qt, QSize, QByteArray, QDate, QRect, QAbstractListModel, QModelIndex,
+                          QObject, QEvent, QTimer, QStandardPaths, QPointF, QSettings, pyqtSignal)
+from PyQt6.QtGui import QIcon, QPainter, QPixmap, QColor, QFont, QFontMetrics, QPen, QStaticText, QImage, QTransform, QBrush, QPolygonF
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QCalendarWidget,
                             QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-                            QPushButton, QListWidget, QFrame, QToolButton, QApplication)
+                            QPushButton, QListView, QFrame, QToolButton, QApplication, QTableView,
+                            QStackedWidget, QToolTip, QSystemTrayIcon, QStyle)
 
 class TagColors:
     COLORS = {
@@ -22,15 +38,383 @@ class TagColors:
     def get_color(tag):
         return TagColors.COLORS.get(tag, QColor('#404040'))
 
+class CellRenderCache:
+    DEFAULT_BACKGROUND = QColor('#2f2f2f')
+    SELECTED_BACKGROUND = QColor('#666666')
+    TEXT_COLOR = QColor(Qt.GlobalColor.white)
+    WEEKEND_COLOR = QColor('#ed1c24')  # Red for weekends
+    HIGHLIGHT_COLOR = QColor('#ffd54f')  # Search matches
+    DOTS_PER_ROW = 5
+    MAX_DOTS = 10  # Maximum 2 rows
+    # Least recently used entries go first, a resize passes through many cell sizes
+    MAX_SIZES = 64
+    MAX_DOT_PIXMAPS = 256
+    
+    def __init__(self, complementary_color):
+        self.complementary_color = complementary_color
+        self._sizes = OrderedDict()
+        self._brushes = {}
+        self._dot_colors = {}
+        self._dots = OrderedDict()
+        
+    def paint(self, painter, rect, day, background_color, text_color, event_count, highlighted=False):
+        # The background and day number are drawn directly, fonts and metrics come from the
+        # cache per cell size and the dots are a cached pixmap per (count, color, dot size),
+        # so a resize only builds a font for each new size
+        font, numbers, text_height, dot_size, highlight_pen = self._metrics(painter.font(), rect.width(),
+                                                                             rect.height())
+        brush = self._brushes.get(background_color.rgba())
+        if brush is None:
+            brush = self._brushes[background_color.rgba()] = QBrush(background_color)
+        painter.save()
+        painter.fillRect(rect, brush)
+        painter.setFont(font)
+        painter.setPen(text_color)
+        number = numbers[day]
+        painter.drawStaticText(rect.left() + round((rect.width() - number.size().width()) / 2), rect.top(), number)
+        
+        if event_count and dot_size:
+            dots = self._dot_pixmap(min(event_count, self.MAX_DOTS), background_color, dot_size,
+                                    painter.device().devicePixelRatioF())
+            painter.drawPixmap(rect.center().x() - self.DOTS_PER_ROW * dot_size,
+                               rect.top() + text_height - 1 + dot_size, dots)
+        
+        if highlighted:
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.setPen(highlight_pen)
+            inset = highlight_pen.width() // 2 + 1
+            painter.drawRect(rect.adjusted(inset, inset, -inset, -inset))
+        painter.restore()
+        
+    def _metrics(self, base_font, width, height):
+        # (font, laid out day numbers, text height, dot size, highlight pen) of a cell size
+        key = (width, height)
+        metrics = self._sizes.get(key)
+        if metrics is None:
+            font = QFont(base_font)
+            font.setPixelSize(max(1, int(height * 0.3)))
+            numbers = [QStaticText(str(day)) for day in range(32)]
+            for number in numbers:
+                number.prepare(font=font)
+            pen = QPen(self.HIGHLIGHT_COLOR, max(2, min(width, height) // 25))
+            metrics = (font, numbers, QFontMetrics(font).height(), min(width, height) // 20, pen)
+            self._sizes[key] = metrics
+            if len(self._sizes) > self.MAX_SIZES:
+                self._sizes.popitem(last=False)
+        else:
+            self._sizes.move_to_end(key)
+        return metrics
+        
+    def _dot_pixmap(self, event_count, background_color, dot_size, ratio):
+        # Rows of dots in the background's complementary color, each row centered in a
+        # pixmap DOTS_PER_ROW dots wide
+        key = (event_count, background_color.rgba(), dot_size, ratio)
+        pixmap = self._dots.get(key)
+        if pixmap is not None:
+            self._dots.move_to_end(key)
+            return pixmap
+        dot_color = self._dot_colors.get(background_color.rgba())
+        if dot_color is None:
+            dot_color = self._dot_colors[background_color.rgba()] = self.complementary_color(background_color)
+        
+        width = self.DOTS_PER_ROW * dot_size * 2
+        num_rows = (event_count + self.DOTS_PER_ROW - 1) // self.DOTS_PER_ROW
+        pixmap = QPixmap(int(width * ratio), int(num_rows * dot_size * 2 * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setBrush(dot_color)
+        painter.setPen(dot_color)
+        for row in range(num_rows):
+            dots_in_this_row = min(self.DOTS_PER_ROW, event_count - (row * self.DOTS_PER_ROW))
+            start_x = width // 2 - dots_in_this_row * dot_size
+            for col in range(dots_in_this_row):
+                painter.drawEllipse(start_x + col * dot_size * 2, row * dot_size * 2, dot_size, dot_size)
+        painter.end()
+        
+        self._dots[key] = pixmap
+        if len(self._dots) > self.MAX_DOT_PIXMAPS:
+            self._dots.popitem(last=False)
+        return pixmap
+
+EVENT_ID_ROLE = Qt.ItemDataRole.UserRole
+RECURRENCE_ID_ROLE = Qt.ItemDataRole.UserRole + 1
+EVENT_DATE_ROLE = Qt.ItemDataRole.UserRole + 2
+CALENDAR_ROLE = Qt.ItemDataRole.UserRole + 3
+
+class EventListModel(QAbstractListModel):
+    PAGE_SIZE = 200
+    
+    def __init__(self, data_service, parent=None):
+        super().__init__(parent)
+        self.data_service = data_service
+        self.date = None
+        self.query = None
+        self._events = []
+        self._next_key = None
+        self._exhausted = True
+        self._loading = False
+        self._generation = 0
+        # Rows name their calendar only while several are shown
+        self.show_calendars = False
+        
+    def load_date(self, date):
+        self._reset(date, None)
+        
+    def load_search(self, query):
+        self._reset(None, query)
+        
+    def _reset(self, date, query):
+        # Only the first page is fetched, the view asks for more as it scrolls
+        self.beginResetModel()
+        self.date = date
+        self.query = query
+        self._events = []
+        self._next_key = None
+        self._exhausted = False
+        self._loading = False
+        self._generation += 1
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+        
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._events)
+        
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted and not self._loading
+        
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        generation = self._generation
+        callback = lambda page: self._append_page(generation, page)
+        error = lambda message: self._page_failed(generation)
+        if self.query is None:
+            self.data_service.request('events', 'get_events_page', self.date, self._next_key, self.PAGE_SIZE,
+                                      callback=callback, error=error)
+        else:
+            self.data_service.request('events', 'search_events', self.query, len(self._events), self.PAGE_SIZE,
+                                      callback=callback, error=error)
+        
+    def _page_failed(self, generation):
+        # The list keeps what it has, asking again would only fail the same way until the next reset
+        if generation == self._generation:
+            self._loading = False
+            self._exhausted = True
+        
+    def _append_page(self, generation, page):
+        if generation != self._generation:
+            return
+        self._loading = False
+        # Rows are kept as (id, day number, time, description, tag, recurrence_id, end_time, calendar)
+        if self.query is None:
+            events, self._next_key = page
+            self._exhausted = self._next_key is None
+            events = [(event[0], self.date) + event[1:] for event in events]
+        else:
+            self._exhausted = len(page) < self.PAGE_SIZE
+            events = [(event[0], day_number(event[1])) + event[2:5] + (event[6], event[5]) + event[7:]
+                      for event in page]
+        if events:
+            self.beginInsertRows(QModelIndex(), len(self._events), len(self._events) + len(events) - 1)
+            self._events.extend(events)
+            self.endInsertRows()
+            
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        event_id, date, time, description, tag, recurrence_id, end_time, calendar = self._events[index.row()]
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            # Formatted on demand, only rows the view actually shows pay for it
+            if end_time:
+                time = f"{time}-{end_time}"
+            if time and tag:
+                text = f"{time} - {description} [{tag}]"
+            elif time:
+                text = f"{time} - {description}"
+            elif tag:
+                text = f"{description} [{tag}]"
+            else:
+                text = description
+            if self.show_calendars:
+                text = f"{text}  ({calendar})"
+            # Search results span many days
+            return f"{iso_date(date)}  {text}" if self.query is not None else text
+        if role == EVENT_ID_ROLE:
+            return event_id
+        if role == RECURRENCE_ID_ROLE:
+            return recurrence_id
+        if role == EVENT_DATE_ROLE:
+            return date
+        if role == CALENDAR_ROLE:
+            return calendar
+        return None
+
+REPEAT_RULES = {
+    'Does not repeat': None,
+    'Daily': 'FREQ=DAILY',
+    'Weekdays': 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR',
+    'Weekly': 'FREQ=WEEKLY',
+    'Monthly': 'FREQ=MONTHLY',
+    'Yearly': 'FREQ=YEARLY'
+}
+
+LEFT_ARROW_SVG = """
+<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
+    <path d="M15.41 7.41L14 6l-6 6 6 6 1.41-1.41L10.83 12z" fill="white"/>
+</svg>
+"""
+
+RIGHT_ARROW_SVG = """
+<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
+    <path d="M8.59 16.59L10 18l6-6-6-6-1.41 1.41L13.17 12z" fill="white"/>
+</svg>
+"""
+
+def cached_svg_icon(name, svg, size):
+    # Rendered once and kept as a PNG named after the SVG's checksum, so later launches
+    # load a file instead of importing QtSvg, and editing the SVG renders it again
+    cache_dir = os.path.join(
+        QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation), 'event-calendar')
+    path = os.path.join(cache_dir, f"{name}-{size}-{zlib.crc32(svg.encode()):08x}.png")
+    pixmap = QPixmap(path)
+    if pixmap.isNull():
+        from PyQt6.QtSvg import QSvgRenderer
+        
+        pixmap = QPixmap(size, size)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        QSvgRenderer(QByteArray(svg.encode())).render(painter)
+        painter.end()
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            pixmap.save(path)
+        except OSError:
+            pass
+    return QIcon(pixmap)
+
+def in_calendar(name, function):
+    # A data worker job calling function with one calendar's database instead of the whole set
+    @wraps(function)
+    def call(calendars, *args, **kwargs):
+        return function(calendars.database(name), *args, **kwargs)
+    return call
+
+def saved_calendars():
+    # (paths, hidden paths) of the calendars added in earlier sessions, files since removed are skipped
+    settings = QSettings('event-calendar', 'calendars')
+    paths = [path for path in settings.value('paths', [], type=list) if os.path.exists(path)]
+    return paths, settings.value('hidden', [], type=list)
+
+class StartupTimer:
+    # Milliseconds from process start to each startup milestone, reported once the first
+    # month's data has been drawn
+    def __init__(self, started, report=True):
+        self.started = started
+        self.report = report
+        self.marks = {}
+        self.on_finished = None
+        
+    def mark(self, name):
+        if name in self.marks:
+            return
+        self.marks[name] = (time.perf_counter() - self.started) * 1000
+        if instrumentation.enabled:
+            # Marks count from process start, they are not slow calls
+            instrumentation.record(f'startup.{name}', self.marks[name], log_slow=False)
+        if name == 'month_loaded':
+            if self.report:
+                print("Startup: " + ', '.join(f"{name} {ms:.0f} ms" for name, ms in self.marks.items()))
+            if self.on_finished:
+                self.on_finished(self.marks)
+
+class RepaintTimer(QObject):
+    # Times a full grid repaint, from the view's paint event to the last cell drawn
+    def __init__(self, calendar):
+        super().__init__(calendar)
+        self.calendar = calendar
+        self._start = None
+        view = calendar.findChild(QTableView, "qt_calendar_calendarview")
+        if view:
+            view.viewport().installEventFilter(self)
+            
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and self._start is None:
+            self._start = time.perf_counter()
+            self.calendar.last_paint_end = None
+            QTimer.singleShot(0, self._finish)
+        return False
+        
+    def _finish(self):
+        if self.calendar.last_paint_end is not None:
+            instrumentation.record('calendar.repaint', (self.calendar.last_paint_end - self._start) * 1000)
+        self._start = None
+
+class ReminderScheduler(QObject):
+    # Keeps a ReminderQueue of today's and tomorrow's timed events and arms one timer for the
+    # next one due, nothing runs in between. Loads go through the data service behind any
+    # pending write, and a write only reloads the days it touched.
+    reminder_due = pyqtSignal(object)
+    
+    def __init__(self, data_service, parent=None):
+        super().__init__(parent)
+        self.data = data_service
+        self.queue = ReminderQueue()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._wake)
+        
+    def reload(self):
+        first_day, last_day = self.queue.window(time.time())
+        self.data.request('reminders', 'get_timed_events', first_day, last_day, priority=LOW_PRIORITY,
+                          callback=lambda rows: self._loaded(first_day, last_day, rows))
+        
+    def refresh_days(self, days):
+        days = [day for day in days if self.queue.first_day is not None
+                and self.queue.first_day <= day <= self.queue.last_day]
+        if days:
+            self.data.request(None, 'get_timed_events', min(days), max(days), priority=LOW_PRIORITY,
+                              callback=lambda rows: self._replaced(days, rows))
+            
+    def _loaded(self, first_day, last_day, rows):
+        self.queue.load(first_day, last_day, rows, time.time())
+        self._wake()
+        
+    def _replaced(self, days, rows):
+        self.queue.replace_days(days, rows, time.time())
+        self._wake()
+        
+    def _wake(self):
+        now = time.time()
+        if self.queue.stale(now):
+            self.reload()
+            return
+        for reminder in self.queue.pop_due(now):
+            self.reminder_due.emit(reminder)
+        self.timer.start(max(0, int((self.queue.next_wakeup(now) - time.time()) * 1000)))
+        
+    def stop(self):
+        self.timer.stop()
+        self.data.cancel('reminders')
+
 class CustomCalendarWidget(QCalendarWidget):
-    def __init__(self, database):
+    # Only paints: its summaries are loaded on the data worker and handed over with set_event_dates
+    def __init__(self):
         super().__init__()
-        self.db = database
         self.event_dates = {}
         self.selected_dates = set()
-        self.update_event_dates()
+        self.search_dates = set()
+        self.render_cache = CellRenderCache(self.get_complementary_color)
+        self.last_paint_end = None
         self.clicked.connect(self.handle_date_clicked)
+        self.view = self.findChild(QTableView, "qt_calendar_calendarview")
         
+        # month_grid_range and the cell lookup in update_dates assume weeks start on Monday
+        self.setFirstDayOfWeek(Qt.DayOfWeek.Monday)
         self.setVerticalHeaderFormat(QCalendarWidget.VerticalHeaderFormat.NoVerticalHeader)
         self.setGridVisible(True)
         
@@ -41,28 +425,6 @@ class CustomCalendarWidget(QCalendarWidget):
         header_format.setFont(header_font)
         self.setHeaderTextFormat(header_format)
         
-        self.setStyleSheet("""
-            QCalendarWidget QTableView {
-                outline: none;
-            }
-            QCalendarWidget QWidget#qt_calendar_navigationbar {
-                background-color: #1a1a1a;
-            }
-            QCalendarWidget QWidget {
-                alternate-background-color: #1a1a1a;
-            }
-            QCalendarWidget QTableView QHeaderView {
-                background-color: #2f2f2f;
-            }
-            QCalendarWidget QTableView QHeaderView::section {
-                color: white;
-                padding: 6px;
-                background-color: #2f2f2f;
-                border: 1px solid #404040;
-                font-size: 16px;
-                padding: 10px 5px;
-            }
-        """)
 
     def get_complementary_color(self, color):
         hue = color.hue()
@@ -70,177 +432,408 @@ class CustomCalendarWidget(QCalendarWidget):
         return QColor.fromHsv(complementary_hue, color.saturation(), color.value())
         
     def handle_date_clicked(self, date):
-        date_str = date.toPyDate().isoformat()
+        day = date.toJulianDay()
         modifiers = QApplication.keyboardModifiers()
         
+        previous = set(self.selected_dates)
         if modifiers == Qt.KeyboardModifier.ControlModifier:
-            if date_str in self.selected_dates:
-                self.selected_dates.remove(date_str)
+            if day in self.selected_dates:
+                self.selected_dates.remove(day)
             else:
-                self.selected_dates.add(date_str)
+                self.selected_dates.add(day)
         else:
             self.selected_dates.clear()
-            self.selected_dates.add(date_str)
+            self.selected_dates.add(day)
             
-        self.updateCells()
+        self.update_dates(previous ^ self.selected_dates)
         
-    def update_event_dates(self):
-        try:
-            first_day_of_grid = self.firstDayOfMonth(self.monthShown(), self.yearShown())
-            while first_day_of_grid.dayOfWeek() > 1:
-                first_day_of_grid = first_day_of_grid.addDays(-1)
-            
-            last_day_of_grid = first_day_of_grid.addDays(41)  # 6 weeks × 7 days - 1
-            
-            start_iso = first_day_of_grid.toPyDate().isoformat()
-            end_iso = last_day_of_grid.toPyDate().isoformat()
-            
-            self.event_dates = {}
-            current_date = first_day_of_grid
-            
-            # Iterate through all visible dates
-            while current_date <= last_day_of_grid:
-                current_iso = current_date.toPyDate().isoformat()
-                events = self.db.get_events(current_iso)
-                
-                if events:
-                    tag = None
-                    for event in events:
-                        if event[2]:  # Check if event has a tag
-                            tag = event[2]
-                            break
-                    
-                    self.event_dates[current_iso] = {
-                        'count': len(events),
-                        'tag': tag if tag else 'NO TAG'
-                    }
-                
-                current_date = current_date.addDays(1)
-            
-        except Exception as e:
-            print(f"Error in update_event_dates: {e}")
-            self.event_dates = {}
+    def update_dates(self, dates):
+        # Repaints only the cells of these day numbers, the rest of the grid is left alone.
+        # Days outside the shown grid are skipped.
+        if self.view is None:
+            self.updateCells()
+            return
+        first_day = day_number(month_grid_range(self.yearShown(), self.monthShown())[0])
+        header_rows = 0 if self.horizontalHeaderFormat() == QCalendarWidget.HorizontalHeaderFormat.NoHorizontalHeader else 1
+        header_columns = 0 if self.verticalHeaderFormat() == QCalendarWidget.VerticalHeaderFormat.NoVerticalHeader else 1
+        model = self.view.model()
+        viewport = self.view.viewport()
+        for day in dates:
+            offset = day - first_day
+            if 0 <= offset < 42:
+                index = model.index(offset // 7 + header_rows, offset % 7 + header_columns)
+                viewport.update(self.view.visualRect(index))
+        
+    def grid_range(self):
+        first_day_of_grid, last_day_of_grid = month_grid_range(self.yearShown(), self.monthShown())
+        return day_number(first_day_of_grid), day_number(last_day_of_grid)
+        
+    def set_search_dates(self, search_dates):
+        changed = self.search_dates ^ search_dates
+        self.search_dates = search_dates
+        self.update_dates(changed)
+        
+    @instrumentation.timed('calendar.set_event_dates')
+    def set_event_dates(self, event_dates):
+        # Cells whose count or tag didn't change keep what is already on screen
+        previous = self.event_dates
+        self.event_dates = event_dates
+        self.update_dates([day for day in previous.keys() | event_dates.keys()
+                           if previous.get(day) != event_dates.get(day)])
+        
+    def merge_event_dates(self, dates, summaries):
+        # Fresh summaries for some days of the grid, days missing from summaries have no events.
+        # The dict is copied, the month cache may hold the current one.
+        event_dates = dict(self.event_dates)
+        for day in dates:
+            if day in summaries:
+                event_dates[day] = summaries[day]
+            else:
+                event_dates.pop(day, None)
+        self.set_event_dates(event_dates)
     
     def firstDayOfMonth(self, month, year):
         return QDate(year, month, 1)
     
     def paintCell(self, painter, rect, date):
-        date_str = date.toPyDate().isoformat()
+        # Every lookup is keyed by the cell's Julian day number, no string is built per cell
+        day = date.toJulianDay()
+        summary = self.event_dates.get(day)
+        event_count = 0
         
-        painter.save()
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        background_color = QColor('#2f2f2f')  # Default background
-        
-        if date_str in self.selected_dates:
-            background_color = QColor('#666666')
-            painter.fillRect(rect, background_color)
-            painter.setPen(Qt.GlobalColor.white)
-        elif date_str in self.event_dates:
-            tag = self.event_dates[date_str]['tag']
-            background_color = TagColors.get_color(tag)
-            painter.fillRect(rect, background_color)
-            painter.setPen(Qt.GlobalColor.white)
+        if day in self.selected_dates:
+            background_color = CellRenderCache.SELECTED_BACKGROUND
+            text_color = CellRenderCache.TEXT_COLOR
+        elif summary:
+            background_color = TagColors.get_color(summary['tag'])
+            text_color = CellRenderCache.TEXT_COLOR
         else:
-            painter.fillRect(rect, background_color)
+            background_color = CellRenderCache.DEFAULT_BACKGROUND
             if date.dayOfWeek() in [6, 7]:  # Saturday and Sunday
-                painter.setPen(QColor('#ed1c24'))  # Red for weekends
+                text_color = CellRenderCache.WEEKEND_COLOR
             else:
-                painter.setPen(Qt.GlobalColor.white)
+                text_color = CellRenderCache.TEXT_COLOR
         
-        font = painter.font()
-        font.setPixelSize(int(rect.height() * 0.3))
-        painter.setFont(font)
+        if summary:
+            event_count = summary['count']
         
-        number_text = str(date.day())
-        painter.drawText(rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignAbsolute, number_text)
+        self.render_cache.paint(painter, rect, date.day(), background_color, text_color, event_count,
+                                day in self.search_dates)
         
-        text_rect = painter.boundingRect(rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, number_text)
+        if instrumentation.enabled:
+            self.last_paint_end = time.perf_counter()
         
-        if date_str in self.event_dates:
-            event_count = self.event_dates[date_str]['count']
-            dot_size = min(rect.width(), rect.height()) // 20
-            
-            dot_color = self.get_complementary_color(background_color)
-            painter.setBrush(dot_color)
-            painter.setPen(dot_color)
+    def clear_selection(self):
+        previous = self.selected_dates
+        self.selected_dates = set()
+        self.update_dates(previous)
+              
+class YearHeatmap(QWidget):
+    # Whole years at a glance, a column per week and a row per weekday. Each day is shaded
+    # by its event count in the color of its dominant tag. The widget takes the arrays of
+    # one get_day_density call for any run of years and paints them once into a pixmap,
+    # later paint events only blit it.
+    day_clicked = pyqtSignal(QDate)
+    LEVELS = 4
+    CAP_PERCENTILE = 0.9  # Busier days than this share all get the full tag color
+    LABEL_WIDTH = 40
+    LABEL_HEIGHT = 22
+    YEAR_GAP = 16
+    GAP = 2
+    MAX_PITCH = 28
+    LABEL_COLOR = QColor('#999999')
+    EMPTY_COLOR = QColor('#1a1a1a')
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.first_year = self.last_year = QDate.currentDate().year()
+        self.start_day = QDate(self.first_year, 1, 1).toJulianDay()
+        self.counts = array('I')
+        self.tags = array('H')
+        self.tag_names = ['NO TAG']
+        self._pixmap = None
+        self.setMinimumHeight(160)
+        policy = self.sizePolicy()
+        policy.setHeightForWidth(True)
+        self.setSizePolicy(policy)
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+        
+    def set_density(self, first_year, last_year, density):
+        self.first_year, self.last_year = first_year, last_year
+        self.start_day = QDate(first_year, 1, 1).toJulianDay()
+        self.counts, self.tags, self.tag_names = density
+        self._pixmap = None
+        self.update()
+        
+    def _layout(self):
+        # (cell pitch, block height), 54 columns fit any year's partial first and last weeks
+        years = self.last_year - self.first_year + 1
+        width = (self.width() - self.LABEL_WIDTH) // 54
+        height = (self.height() - years * (self.LABEL_HEIGHT + self.YEAR_GAP)) // (7 * years)
+        pitch = max(4, min(width, height, self.MAX_PITCH))
+        return pitch, self.LABEL_HEIGHT + 7 * pitch + self.YEAR_GAP
+        
+    def hasHeightForWidth(self):
+        return True
+        
+    def heightForWidth(self, width):
+        # Tall enough for square cells across the width, so layouts leave no gap below
+        pitch = max(4, min((width - self.LABEL_WIDTH) // 54, self.MAX_PITCH))
+        return (self.last_year - self.first_year + 1) * (self.LABEL_HEIGHT + 7 * pitch + self.YEAR_GAP)
+        
+    def _first_monday(self, year):
+        first = QDate(year, 1, 1).toJulianDay()
+        # Julian day 0 was a Monday
+        return first - first % 7
+        
+    def day_at(self, pos):
+        pitch, block = self._layout()
+        year = self.first_year + pos.y() // block
+        y = pos.y() % block - self.LABEL_HEIGHT
+        x = pos.x() - self.LABEL_WIDTH
+        if year > self.last_year or x < 0 or y < 0 or y >= 7 * pitch:
+            return None
+        day = self._first_monday(year) + x // pitch * 7 + y // pitch
+        if not QDate(year, 1, 1).toJulianDay() <= day <= QDate(year, 12, 31).toJulianDay():
+            return None
+        return day
+        
+    def paintEvent(self, event):
+        ratio = self.devicePixelRatioF()
+        if self._pixmap is None or self._pixmap.size() != self.size() * ratio:
+            started = time.perf_counter()
+            self._pixmap = self._render(ratio)
+            if instrumentation.enabled:
+                instrumentation.record('heatmap.render', (time.perf_counter() - started) * 1000)
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._pixmap)
+        painter.end()
+        
+    def _render(self, ratio):
+        pixmap = QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        pitch, block = self._layout()
+        
+        nonzero = sorted(count for count in self.counts if count)
+        cap = nonzero[int(len(nonzero) * self.CAP_PERCENTILE)] if nonzero else 1
+        # ARGB of each (tag, shade), mixed from the empty color so every shade is opaque
+        palette = {}
+        empty = self.EMPTY_COLOR
+        tile = QPixmap(int(pitch * ratio), int(pitch * ratio))
+        tile.setDevicePixelRatio(ratio)
+        tile.fill(Qt.GlobalColor.transparent)
+        tile_painter = QPainter(tile)
+        tile_painter.fillRect(0, 0, pitch - self.GAP, pitch - self.GAP, Qt.GlobalColor.white)
+        tile_painter.end()
+        mask = QBrush(tile)
+        
+        painter = QPainter(pixmap)
+        font = QFont(painter.font())
+        font.setPixelSize(11)
+        painter.setFont(font)
+        painter.setPen(self.LABEL_COLOR)
+        for year in range(self.first_year, self.last_year + 1):
+            top = (year - self.first_year) * block
+            monday = self._first_monday(year)
+            first, last = QDate(year, 1, 1).toJulianDay(), QDate(year, 12, 31).toJulianDay()
             
-            # Calculate dots layout
-            dots_per_row = 5
-            num_rows = (event_count + dots_per_row - 1) // dots_per_row
-            num_rows = min(num_rows, 2)  # Maximum 2 rows
+            painter.drawText(QRect(0, top, self.LABEL_WIDTH, self.LABEL_HEIGHT),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, str(year))
+            for month in range(1, 13):
+                column = (QDate(year, month, 1).toJulianDay() - monday) // 7
+                painter.drawText(QRect(self.LABEL_WIDTH + column * pitch, top, 4 * pitch, self.LABEL_HEIGHT),
+                                 Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                                 QDate(year, month, 1).toString('MMM'))
+            for row, name in ((0, 'Mon'), (2, 'Wed'), (4, 'Fri')):
+                painter.drawText(QRect(0, top + self.LABEL_HEIGHT + row * pitch, self.LABEL_WIDTH - 6, pitch),
+                                 Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, name)
             
-            start_y = text_rect.bottom() + dot_size
+            # One pixel per day from the Monday before January 1st, a row per week, so the
+            # days are consecutive. Days outside the year stay transparent.
+            pixels = array('I', [0]) * (54 * 7)
+            for day in range(first, last + 1):
+                offset = day - self.start_day
+                count = self.counts[offset] if 0 <= offset < len(self.counts) else 0
+                key = (self.tags[offset], min(self.LEVELS, -(-count * self.LEVELS // cap))) if count else None
+                argb = palette.get(key)
+                if argb is None:
+                    if key is None:
+                        argb = empty.rgba()
+                    else:
+                        color = TagColors.get_color(self.tag_names[key[0]])
+                        mix = key[1] / self.LEVELS
+                        argb = QColor(int(empty.red() + (color.red() - empty.red()) * mix),
+                                      int(empty.green() + (color.green() - empty.green()) * mix),
+                                      int(empty.blue() + (color.blue() - empty.blue()) * mix)).rgba()
+                    palette[key] = argb
+                pixels[day - monday] = argb
+            image = QImage(pixels.tobytes(), 7, 54, 7 * 4, QImage.Format.Format_ARGB32)
             
-            for row in range(num_rows):
-                dots_in_this_row = min(dots_per_row, event_count - (row * dots_per_row))
-                total_width = dots_in_this_row * (dot_size * 2)
-                start_x = rect.center().x() - (total_width // 2)
-                
-                for col in range(dots_in_this_row):
-                    x = start_x + (col * dot_size * 2)
-                    y = start_y + (row * dot_size * 2)
-                    painter.drawEllipse(x, y, dot_size, dot_size)
+            # Transposed and scaled up in one draw, weeks become columns and weekdays rows
+            x, y = self.LABEL_WIDTH, top + self.LABEL_HEIGHT
+            painter.save()
+            painter.setTransform(QTransform(0, pitch, pitch, 0, x, y), True)
+            painter.drawImage(0, 0, image)
+            painter.restore()
+            # Then one fill with a tile of a single cell cuts the gaps between cells
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_DestinationIn)
+            painter.setBrushOrigin(x, y)
+            painter.fillRect(x, y, 54 * pitch, 7 * pitch, mask)
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+        painter.end()
+        return pixmap
         
-        painter.restore()
+    def event(self, event):
+        if event.type() == QEvent.Type.ToolTip:
+            day = self.day_at(event.pos())
+            if day is None:
+                QToolTip.hideText()
+                event.ignore()
+                return True
+            offset = day - self.start_day
+            count = self.counts[offset] if 0 <= offset < len(self.counts) else 0
+            text = f"{iso_date(day)}: {count:,} event{'s' if count != 1 else ''}"
+            if count and self.tags[offset]:
+                text += f", mostly {self.tag_names[self.tags[offset]]}"
+            QToolTip.showText(event.globalPos(), text, self)
+            return True
+        return super().event(event)
         
-    def clear_selection(self):
-        self.selected_dates.clear()
-        self.updateCells()
-
-    def on_selection_changed(self):
-        self.update_event_dates()
-        self.updateCells()  
+    def mousePressEvent(self, event):
+        day = self.day_at(event.position().toPoint())
+        if day is not None and event.button() == Qt.MouseButton.LeftButton:
+            self.day_clicked.emit(QDate.fromJulianDay(day))
+              
+class TagTrendChart(QWidget):
+    # Events per tag per period of a get_tag_trend result, a line per tag in its tag color
+    MARGIN_LEFT = 40
+    MARGIN_BOTTOM = 20
+    MARGIN_TOP = 20
+    LABEL_COLOR = QColor('#999999')
+    AXIS_COLOR = QColor('#404040')
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.periods = []
+        self.series = {}
+        self.setMinimumHeight(160)
+        
+    def set_trend(self, trend):
+        self.periods, self.series = trend
+        self.update()
+        
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        font = QFont(painter.font())
+        font.setPixelSize(11)
+        painter.setFont(font)
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        width = self.width() - left - 10
+        height = self.height() - top - self.MARGIN_BOTTOM
+        peak = max((max(counts) for counts in self.series.values()), default=0)
+        
+        painter.setPen(self.AXIS_COLOR)
+        painter.drawLine(left, top + height, left + width, top + height)
+        painter.setPen(self.LABEL_COLOR)
+        painter.drawText(QRect(0, top - 6, left - 6, 12), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                         f"{peak:,}")
+        if not peak or len(self.periods) < 2:
+            painter.drawText(QRect(left, top, width, height), Qt.AlignmentFlag.AlignCenter, "No events")
+            painter.end()
+            return
+        
+        step = width / (len(self.periods) - 1)
+        # Monthly charts label every period, weekly ones the first week of each month
+        previous_month = None
+        for index, period in enumerate(self.periods):
+            date = QDate.fromString(period, Qt.DateFormat.ISODate)
+            # A week belongs to the month of its Thursday
+            label_date = date.addDays(3) if len(self.periods) > 24 else date
+            if label_date.month() != previous_month:
+                previous_month = label_date.month()
+                x = int(left + index * step)
+                painter.drawText(QRect(x - 20, top + height + 4, 40, 14), Qt.AlignmentFlag.AlignCenter,
+                                 label_date.toString('MMM'))
+        
+        legend_x = left
+        for tag, counts in self.series.items():
+            color = TagColors.get_color(tag)
+            painter.setPen(QPen(color, 2))
+            painter.drawPolyline(QPolygonF([QPointF(left + index * step, top + height - count * height / peak)
+                                            for index, count in enumerate(counts)]))
+            painter.drawText(QRect(legend_x, 0, 100, 14), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, tag)
+            legend_x += painter.fontMetrics().horizontalAdvance(tag) + 16
+        painter.end()
+              
+class ExportOptionsDialog(QDialog):
+    # Date range and tag for an export, the whole calendar unless limited
+    def __init__(self, first_date, last_date, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export")
+        layout = QFormLayout(self)
+        
+        self.limit_dates = QCheckBox("Only these dates")
+        layout.addRow(self.limit_dates)
+        self.start_edit = QDateEdit(first_date)
+        self.end_edit = QDateEdit(last_date)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat('yyyy-MM-dd')
+            edit.setEnabled(False)
+            self.limit_dates.toggled.connect(edit.setEnabled)
+        layout.addRow("From:", self.start_edit)
+        layout.addRow("To:", self.end_edit)
+        
+        self.tag_combo = QComboBox()
+        self.tag_combo.addItems(['All Tags', 'Work', 'Personal', 'School', 'Family', 'Travel'])
+        layout.addRow("Tag:", self.tag_combo)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+        
+    def filters(self):
+        # (start, end, tag) as export_events takes them, None where not limited
+        start = end = None
+        if self.limit_dates.isChecked():
+            start = self.start_edit.date().toString(Qt.DateFormat.ISODate)
+            end = self.end_edit.date().toString(Qt.DateFormat.ISODate)
+        tag = self.tag_combo.currentText() if self.tag_combo.currentIndex() else None
+        return start, end, tag
               
 class ModernCalendar(QMainWindow):
-    def __init__(self):
+    def __init__(self, month_cache_size=12, db=None, startup=None):
         super().__init__()
-        self.db = CalendarDatabase()
+        self.startup = startup
+        if startup:
+            startup.mark('init')
+        # Set before any widget exists, so each one is polished once against the final sheet
+        app = QApplication.instance()
+        if app.styleSheet() != STYLESHEET:
+            app.setStyleSheet(STYLESHEET)
+        self.setObjectName('calendarWindow')
+        # Opening the first calendar here applies any pending migrations before the worker
+        # starts, the others are opened by the worker when first shown
+        self.db = db or CalendarSet()
+        self.db.database()
+        self.data = DataService(self.db, self)
+        self.month_cache = MonthGridCache(month_cache_size)
+        self.initial_data_requested = False
+        self.tray = None
+        self.reminders = ReminderScheduler(self.data, self)
+        self.reminders.reminder_due.connect(self.show_reminder)
         self.init_ui()
         
     def _create_svg_arrows(self):
-        # Left arrow icon
-        left_arrow_svg = """
-        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
-            <path d="M15.41 7.41L14 6l-6 6 6 6 1.41-1.41L10.83 12z" fill="white"/>
-        </svg>
-        """
-        
-        # Right arrow icon
-        right_arrow_svg = """
-        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
-            <path d="M8.59 16.59L10 18l6-6-6-6-1.41 1.41L13.17 12z" fill="white"/>
-        </svg>
-        """
-        
-        size = QSize(24, 24)
-        
-        # Create left icon
-        left_pixmap = QPixmap(size)
-        left_pixmap.fill(Qt.GlobalColor.transparent)
-        left_renderer = QSvgRenderer(QByteArray(left_arrow_svg.encode()))
-        painter = QPainter(left_pixmap)
-        left_renderer.render(painter)
-        painter.end()
-        left_icon = QIcon(left_pixmap)
-        
-        # Create right icon
-        right_pixmap = QPixmap(size)
-        right_pixmap.fill(Qt.GlobalColor.transparent)
-        right_renderer = QSvgRenderer(QByteArray(right_arrow_svg.encode()))
-        painter = QPainter(right_pixmap)
-        right_renderer.render(painter)
-        painter.end()
-        right_icon = QIcon(right_pixmap)
-        
-        return left_icon, right_icon
+        return cached_svg_icon('arrow-left', LEFT_ARROW_SVG, 24), cached_svg_icon('arrow-right', RIGHT_ARROW_SVG, 24)
         
     def init_ui(self):
         self.setWindowTitle("Calendar")
         self.setMinimumSize(1200, 800)
         
-        self.setStyleSheet("QMainWindow { background-color: #1a1a1a; }")
-        
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         main_layout = QHBoxLayout(central_widget)
@@ -249,56 +842,80 @@ class ModernCalendar(QMainWindow):
         
         # Left card (calendar section)
         calendar_card = QFrame()
-        calendar_card.setStyleSheet("""
-            QFrame {
-                background-color: #2d2d2d;
-                border-radius: 10px;
-            }
-        """)
+        calendar_card.setObjectName('calendarCard')
         self._setup_calendar_section(calendar_card)
         main_layout.addWidget(calendar_card, 7)
         
         # Right card (events section)
         events_card = QFrame()
-        events_card.setStyleSheet("""
-            QFrame {
-                background-color: #2d2d2d;
-                border-radius: 10px;
-                padding: 20px;
-            }
-        """)
+        events_card.setObjectName('eventsCard')
         self._setup_events_section(events_card)
         main_layout.addWidget(events_card, 3)
         
-        self._apply_styles()
-        self.update_events()
+        if instrumentation.enabled:
+            # Periodic dump so a session that crashes or hangs still leaves numbers behind
+            self.profile_timer = QTimer(self)
+            self.profile_timer.timeout.connect(instrumentation.dump)
+            self.profile_timer.start(10000)
+        
         self.showMaximized()
+        if self.startup:
+            self.startup.mark('window')
+        
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.initial_data_requested:
+            # The first month loads once the empty window is on screen, not before it
+            self.initial_data_requested = True
+            QTimer.singleShot(0, self.load_initial_data)
+            
+    def load_initial_data(self):
+        if self.startup:
+            self.startup.mark('first_paint')
+        self.refresh_calendar()
+        self.update_events()
+        self.prefetcher.prefetch()
+        self.reminders.reload()
 
     def _setup_calendar_section(self, parent):
         layout = QVBoxLayout(parent)
         layout.setContentsMargins(20, 20, 20, 20)
         layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
+        header_layout = QHBoxLayout()
         header = QLabel("Calendar")
-        header.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 24px;
-                font-weight: bold;
-                padding-bottom: 15px;
-            }
-        """)
+        header.setObjectName('calendarHeader')
         header.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        layout.addWidget(header)
+        header_layout.addWidget(header)
+        header_layout.addStretch()
+        
+        # One checkable entry per calendar file, hidden calendars are never queried
+        self.calendars_button = QPushButton("Calendars")
+        self.calendars_button.setObjectName('secondaryButton')
+        self.calendars_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.calendars_menu = QMenu(self.calendars_button)
+        self.calendars_menu.aboutToShow.connect(self.fill_calendars_menu)
+        self.calendars_button.setMenu(self.calendars_menu)
+        header_layout.addWidget(self.calendars_button, 0, Qt.AlignmentFlag.AlignTop)
+        
+        self.view_button = QPushButton("Year")
+        self.view_button.setObjectName('secondaryButton')
+        self.view_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.view_button.clicked.connect(self.toggle_year_view)
+        header_layout.addWidget(self.view_button, 0, Qt.AlignmentFlag.AlignTop)
+        layout.addLayout(header_layout)
         
         calendar_container = QWidget()
         calendar_layout = QVBoxLayout(calendar_container)
         calendar_layout.setContentsMargins(0, 0, 0, 0)
         
-        self.calendar = CustomCalendarWidget(self.db)
+        self.calendar = CustomCalendarWidget()
         self.calendar.setVerticalHeaderFormat(QCalendarWidget.VerticalHeaderFormat.NoVerticalHeader)
         self.calendar.clicked.connect(self.update_events)
         self.calendar.currentPageChanged.connect(self.on_month_changed)
+        self.prefetcher = MonthPrefetcher(self.data, self.month_cache, self.calendar, parent=self)
+        if instrumentation.enabled:
+            self.repaint_timer = RepaintTimer(self.calendar)
         self.calendar.setMinimumWidth(parent.width() - 40)
         
         nav_bar = self.calendar.findChild(QWidget, "qt_calendar_navigationbar")
@@ -314,7 +931,60 @@ class ModernCalendar(QMainWindow):
                 next_button.setIconSize(QSize(24, 24))
         
         calendar_layout.addWidget(self.calendar)
-        layout.addWidget(calendar_container)
+        
+        # The year overview takes the month grid's place, with its own year navigation
+        year_container = QWidget()
+        year_layout = QVBoxLayout(year_container)
+        year_layout.setContentsMargins(0, 0, 0, 0)
+        
+        year_nav = QHBoxLayout()
+        left_icon, right_icon = self._create_svg_arrows()
+        prev_year = QToolButton()
+        prev_year.setObjectName('yearNavButton')
+        prev_year.setIcon(left_icon)
+        prev_year.setIconSize(QSize(24, 24))
+        prev_year.clicked.connect(lambda: self.show_year(self.heatmap_year - 1))
+        next_year = QToolButton()
+        next_year.setObjectName('yearNavButton')
+        next_year.setIcon(right_icon)
+        next_year.setIconSize(QSize(24, 24))
+        next_year.clicked.connect(lambda: self.show_year(self.heatmap_year + 1))
+        self.year_label = QLabel()
+        self.year_label.setObjectName('yearLabel')
+        self.year_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        year_nav.addWidget(prev_year)
+        year_nav.addWidget(self.year_label, 1)
+        year_nav.addWidget(next_year)
+        year_layout.addLayout(year_nav)
+        
+        self.heatmap = YearHeatmap()
+        self.heatmap.day_clicked.connect(self.show_heatmap_day)
+        year_layout.addWidget(self.heatmap)
+        self.heatmap_year = None
+        
+        # Statistics for the same year, read from the daily tag count rollup
+        stats_header = QHBoxLayout()
+        trend_label = QLabel("Events per tag")
+        trend_label.setObjectName('fieldLabel')
+        stats_header.addWidget(trend_label)
+        stats_header.addStretch()
+        self.trend_period = QComboBox()
+        self.trend_period.addItems(['By month', 'By week'])
+        self.trend_period.currentIndexChanged.connect(self.refresh_year_view)
+        stats_header.addWidget(self.trend_period)
+        year_layout.addLayout(stats_header)
+        
+        self.trend_chart = TagTrendChart()
+        year_layout.addWidget(self.trend_chart, 1)
+        self.busiest_label = QLabel()
+        self.busiest_label.setObjectName('fieldLabel')
+        self.busiest_label.setWordWrap(True)
+        year_layout.addWidget(self.busiest_label)
+        
+        self.calendar_stack = QStackedWidget()
+        self.calendar_stack.addWidget(calendar_container)
+        self.calendar_stack.addWidget(year_container)
+        layout.addWidget(self.calendar_stack)
         
     def _setup_events_section(self, parent):
         layout = QVBoxLayout(parent)
@@ -322,39 +992,29 @@ class ModernCalendar(QMainWindow):
         layout.setSpacing(2)
         
         events_label = QLabel("Events Details")
-        events_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 24px;
-                font-weight: bold;
-                margin-bottom: 15px;
-                text-align: center;
-            }
-        """)
+        events_label.setObjectName('eventsHeader')
         events_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(events_label)
         
-        self.events_list = QListWidget()
+        self.search_input = QLineEdit()
+        self.search_input.setObjectName('searchInput')
+        self.search_input.setPlaceholderText("Search all events")
+        self.search_input.setClearButtonEnabled(True)
+        # Wait for a pause in typing instead of querying on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.search_input)
+        
+        self.events_model = EventListModel(self.data, self)
+        self.events_list = QListView()
+        self.events_list.setObjectName('eventsList')
+        self.events_list.setModel(self.events_model)
+        self.events_list.setUniformItemSizes(True)
         self.events_list.setMinimumHeight(150)
-        self.events_list.setStyleSheet("""
-            QListWidget {
-                background-color: #252525;
-                border: 1px solid #333;
-                border-radius: 4px;
-                color: white;
-                font-size: 14px;
-                padding: 5px;
-            }
-            QListWidget::item {
-                padding: 5px;
-                margin: 2px 0;
-                text-align: center;
-            }
-            QListWidget::item:selected {
-                background-color: #ed1c24;
-                color: white;
-            }
-        """)
+        self.events_list.doubleClicked.connect(self.show_search_result)
         layout.addWidget(self.events_list)
 
         spacer = QWidget()
@@ -369,35 +1029,12 @@ class ModernCalendar(QMainWindow):
         title_layout.setSpacing(2)
         
         title_label = QLabel("Event Title:")
-        title_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 14px;
-                padding: 0;
-                margin: 0;
-            }
-        """)
+        title_label.setObjectName('fieldLabel')
         title_layout.addWidget(title_label)
         
         self.title_input = QLineEdit()
+        self.title_input.setObjectName('formInput')
         self.title_input.setPlaceholderText("Enter event title")
-        self.title_input.setStyleSheet("""
-            QLineEdit {
-                padding: 8px;
-                background-color: #252525;
-                border: 1px solid #333;
-                border-radius: 4px;
-                color: white;
-                font-size: 14px;
-                margin: 0;
-            }
-            QLineEdit:focus {
-                border: 1px solid #ed1c24;
-            }
-            QLineEdit::placeholder {
-                color: #808080;
-            }
-        """)
         title_layout.addWidget(self.title_input)
         layout.addWidget(title_container)
         
@@ -408,38 +1045,39 @@ class ModernCalendar(QMainWindow):
         time_layout.setSpacing(2)
         
         time_label = QLabel("Time (HH:MM):")
-        time_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 14px;
-                padding: 0;
-                margin: 0;
-            }
-        """)
+        time_label.setObjectName('fieldLabel')
         time_layout.addWidget(time_label)
         
         self.time_input = QLineEdit()
+        self.time_input.setObjectName('formInput')
         self.time_input.setPlaceholderText("Optional (e.g., 14:30)")
-        self.time_input.setStyleSheet("""
-            QLineEdit {
-                padding: 8px;
-                background-color: #252525;
-                border: 1px solid #333;
-                border-radius: 4px;
-                color: white;
-                font-size: 14px;
-                margin: 0;
-            }
-            QLineEdit:focus {
-                border: 1px solid #ed1c24;
-            }
-            QLineEdit::placeholder {
-                color: #808080;
-            }
-        """)
         time_layout.addWidget(self.time_input)
         layout.addWidget(time_container)
         
+        # End Time Input
+        end_time_container = QWidget()
+        end_time_layout = QVBoxLayout(end_time_container)
+        end_time_layout.setContentsMargins(0, 0, 0, 0)
+        end_time_layout.setSpacing(2)
+        
+        end_time_label = QLabel("End Time (HH:MM):")
+        end_time_label.setObjectName('fieldLabel')
+        end_time_layout.addWidget(end_time_label)
+        
+        end_time_row = QHBoxLayout()
+        self.end_time_input = QLineEdit()
+        self.end_time_input.setObjectName('formInput')
+        self.end_time_input.setPlaceholderText("Optional")
+        end_time_row.addWidget(self.end_time_input)
+        
+        self.find_time_button = QPushButton("Find Free Time")
+        self.find_time_button.setObjectName('secondaryButton')
+        self.find_time_button.clicked.connect(self.find_free_time)
+        self.find_time_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        end_time_row.addWidget(self.find_time_button)
+        end_time_layout.addLayout(end_time_row)
+        layout.addWidget(end_time_container)
+        
         # Tag Selection
         tag_container = QWidget()
         tag_layout = QVBoxLayout(tag_container)
@@ -447,112 +1085,62 @@ class ModernCalendar(QMainWindow):
         tag_layout.setSpacing(2)
         
         tag_label = QLabel("Tag:")
-        tag_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 14px;
-                padding: 0;
-                margin: 0;
-            }
-        """)
+        tag_label.setObjectName('fieldLabel')
         tag_layout.addWidget(tag_label)
         
         self.tag_combo = QComboBox()
         self.tag_combo.addItems(['No Tag', 'Work', 'Personal', 'School', 'Family', 'Travel'])
-        self.tag_combo.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                background-color: #252525;
-                border: 1px solid #333;
-                border-radius: 4px;
-                color: white;
-                font-size: 14px;
-                margin: 0;
-            }
-            QComboBox:drop-down {
-                border: none;
-            }
-            QComboBox::down-arrow {
-                image: none;
-                border-left: 4px solid transparent;
-                border-right: 4px solid transparent;
-                border-top: 6px solid #666;
-                margin-right: 8px;
-            }
-            QComboBox QAbstractItemView {
-                background-color: #252525;
-                color: white;
-                selection-background-color: #ed1c24;
-            }
-        """)
         tag_layout.addWidget(self.tag_combo)
         layout.addWidget(tag_container)
         
+        # Calendar Selection, shown once there is more than one to add to
+        self.calendar_choice_container = QWidget()
+        calendar_choice_layout = QVBoxLayout(self.calendar_choice_container)
+        calendar_choice_layout.setContentsMargins(0, 0, 0, 0)
+        calendar_choice_layout.setSpacing(2)
+        
+        calendar_choice_label = QLabel("Calendar:")
+        calendar_choice_label.setObjectName('fieldLabel')
+        calendar_choice_layout.addWidget(calendar_choice_label)
+        
+        self.calendar_combo = QComboBox()
+        calendar_choice_layout.addWidget(self.calendar_combo)
+        layout.addWidget(self.calendar_choice_container)
+        self.update_calendar_choices()
+        
+        # Repeat Selection
+        repeat_container = QWidget()
+        repeat_layout = QVBoxLayout(repeat_container)
+        repeat_layout.setContentsMargins(0, 0, 0, 0)
+        repeat_layout.setSpacing(2)
+        
+        repeat_label = QLabel("Repeat:")
+        repeat_label.setObjectName('fieldLabel')
+        repeat_layout.addWidget(repeat_label)
+        
+        self.repeat_combo = QComboBox()
+        self.repeat_combo.addItems(list(REPEAT_RULES))
+        repeat_layout.addWidget(self.repeat_combo)
+        layout.addWidget(repeat_container)
+        
         # Buttons
         button_layout = QHBoxLayout()
         button_layout.setContentsMargins(0, 10, 0, 0)
         
         self.add_button = QPushButton("Add Event")
+        self.add_button.setObjectName('addButton')
         self.add_button.clicked.connect(self.add_event)
         self.add_button.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.add_button.setStyleSheet("""
-            QPushButton {
-                background-color: #ed1c24;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 10px 20px;
-                font-weight: bold;
-                margin-right: 5px;
-            }
-            QPushButton:hover {
-                background-color: #ff2c35;
-            }
-            QPushButton:pressed {
-                background-color: #d31820;
-            }
-        """)
         
         self.delete_button = QPushButton("Delete Event")
+        self.delete_button.setObjectName('deleteButton')
         self.delete_button.clicked.connect(self.delete_event)
         self.delete_button.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.delete_button.setStyleSheet("""
-            QPushButton {
-                background-color: #404040;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 10px 20px;
-                font-weight: bold;
-                margin-right: 5px;
-            }
-            QPushButton:hover {
-                background-color: #4a4a4a;
-            }
-            QPushButton:pressed {
-                background-color: #363636;
-            }
-        """)
         
         self.clear_selection_button = QPushButton("Clear Selection")
+        self.clear_selection_button.setObjectName('secondaryButton')
         self.clear_selection_button.clicked.connect(self.clear_selection)
         self.clear_selection_button.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.clear_selection_button.setStyleSheet("""
-            QPushButton {
-                background-color: #2d2d2d;
-                color: white;
-                border: 1px solid #404040;
-                border-radius: 4px;
-                padding: 10px 20px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #363636;
-            }
-            QPushButton:pressed {
-                background-color: #2a2a2a;
-            }
-        """)
         
         button_layout.addWidget(self.add_button)
         button_layout.addWidget(self.delete_button)
@@ -560,163 +1148,200 @@ class ModernCalendar(QMainWindow):
         button_layout.addStretch()
         
         layout.addLayout(button_layout)
+        
+        # Import / export
+        transfer_layout = QHBoxLayout()
+        transfer_layout.setContentsMargins(0, 10, 0, 0)
+        
+        self.import_button = QPushButton("Import .ics")
+        self.import_button.setObjectName('secondaryButton')
+        self.import_button.clicked.connect(self.import_calendar)
+        self.import_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        
+        self.export_button = QPushButton("Export")
+        self.export_button.setObjectName('secondaryButton')
+        self.export_button.clicked.connect(self.export_calendar)
+        self.export_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        
+        transfer_layout.addWidget(self.import_button)
+        transfer_layout.addWidget(self.export_button)
+        transfer_layout.addStretch()
+        
+        layout.addLayout(transfer_layout)
         layout.addStretch()
     
-    def _apply_styles(self):
-        self.calendar.setStyleSheet("""
-            QCalendarWidget {
-                background-color: #1a1a1a;
-                border: none;
-            }
-            
-            QCalendarWidget QWidget {
-                alternate-background-color: #1a1a1a;
-                color: white;
-            }
-            
-            QCalendarWidget QWidget#qt_calendar_navigationbar {
-                background-color: #1a1a1a;
-                min-height: 50px;
-                border-top-left-radius: 8px;
-                border-top-right-radius: 8px;
-            }
-            
-            QCalendarWidget QToolButton {
-                color: white;
-                font-size: 18px;
-                font-weight: bold;
-                background-color: transparent;
-                padding: 10px;
-            }
-            
-            QCalendarWidget QMenu {
-                width: 150px;
-                left: 20px;
-                color: white;
-                background-color: #1a1a1a;
-                border: 1px solid #404040;
-            }
-            
-            QCalendarWidget QSpinBox {
-                color: white;
-                background-color: #1a1a1a;
-                selection-background-color: #ed1c24;
-                selection-color: white;
-            }
-            
-            QCalendarWidget QTableView {
-                background-color: #2f2f2f;
-                selection-background-color: #ed1c24;
-                selection-color: white;
-                border: none;
-                outline: none;
-            }
-            
-            QCalendarWidget QTableView QHeaderView::section {
-                color: white;
-                padding: 6px;
-                background-color: #2f2f2f;
-                border: 1px solid #404040;
-            }
-            
-            QCalendarWidget QTableView::item {
-                border: 1px solid #404040;
-                padding: 5px;
-            }
-            
-            QCalendarWidget QAbstractItemView:enabled {
-                color: white;
-                selection-background-color: #ed1c24;
-                selection-color: white;
-            }
-            
-            QCalendarWidget QAbstractItemView:disabled {
-                color: #666;
-            }
+    def fill_calendars_menu(self):
+        self.calendars_menu.clear()
+        visible = set(self.db.visible())
+        for name in self.db.names():
+            action = self.calendars_menu.addAction(name)
+            action.setCheckable(True)
+            action.setChecked(name in visible)
+            action.setToolTip(self.db.path(name))
+            action.toggled.connect(partial(self.toggle_calendar, name))
+        self.calendars_menu.addSeparator()
+        self.calendars_menu.addAction("Add Calendar...", self.add_calendar)
+        
+    def add_calendar(self):
+        # An existing calendar file, or a new name for an empty one
+        path, _ = QFileDialog.getSaveFileName(self, "Add calendar", "", "Calendar files (*.db)",
+                                              options=QFileDialog.Option.DontConfirmOverwrite)
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += '.db'
+        name = self.db.add(path)
+        self.db.set_visible(name, True)
+        self.calendars_changed()
+        
+    def toggle_calendar(self, name, visible):
+        try:
+            self.db.set_visible(name, visible)
+        except ValueError as e:
+            self.statusBar().showMessage(str(e), 5000)
+            return
+        self.calendars_changed()
+        
+    def calendars_changed(self):
+        settings = QSettings('event-calendar', 'calendars')
+        settings.setValue('paths', [os.path.abspath(self.db.path(name)) for name in self.db.names()])
+        settings.setValue('hidden', [os.path.abspath(self.db.path(name)) for name in self.db.names()
+                                     if name not in self.db.visible()])
+        self.update_calendar_choices()
+        # Every cached month and reminder may have changed
+        self.month_cache.clear()
+        self.refresh_calendar()
+        self.refresh_year_view()
+        self.reminders.reload()
+        self.update_events()
+        
+    def update_calendar_choices(self):
+        current = self.calendar_combo.currentText()
+        visible = self.db.visible()
+        self.calendar_combo.clear()
+        self.calendar_combo.addItems(visible)
+        if current in visible:
+            self.calendar_combo.setCurrentText(current)
+        self.calendar_choice_container.setVisible(len(visible) > 1)
+        self.events_model.show_calendars = len(visible) > 1
+        
+    def target_calendar(self):
+        return self.calendar_combo.currentText() or None
+        
+    def refresh_calendar(self):
+        year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        cached = self.month_cache.get(year, month)
+        if cached is not None:
+            # Drop any load still in flight for a month we already paged past
+            self.data.cancel('grid')
+            self.calendar.set_event_dates(cached)
+            return
+        
+        generation = self.month_cache.generation
+        
+        def loaded(event_dates):
+            self.month_cache.put(year, month, event_dates, generation)
+            self.calendar.set_event_dates(event_dates)
+            if self.startup:
+                self.startup.mark('month_loaded')
+        
+        start_day, end_day = self.calendar.grid_range()
+        self.data.request('grid', 'get_event_summaries', start_day, end_day, callback=loaded)
+
+    def toggle_year_view(self):
+        if self.calendar_stack.currentIndex() == 1:
+            self.calendar_stack.setCurrentIndex(0)
+            self.view_button.setText("Year")
+            for key in ('heatmap', 'trend', 'busiest'):
+                self.data.cancel(key)
+            return
+        self.calendar_stack.setCurrentIndex(1)
+        self.view_button.setText("Month")
+        self.show_year(self.calendar.yearShown())
+        
+    def show_year(self, year):
+        self.heatmap_year = year
+        self.year_label.setText(str(year))
+        self.refresh_year_view()
+        
+    def refresh_year_view(self):
+        # The heatmap and statistics read the year's rollup rows on the data worker, only while shown
+        if self.calendar_stack.currentIndex() != 1:
+            return
+        year = self.heatmap_year
+        first_day, last_day = QDate(year, 1, 1).toJulianDay(), QDate(year, 12, 31).toJulianDay()
+        self.data.request('heatmap', 'get_day_density', first_day, last_day,
+                          callback=lambda density: self.heatmap.set_density(year, year, density))
+        period = 'week' if self.trend_period.currentIndex() else 'month'
+        self.data.request('trend', 'get_tag_trend', first_day, last_day, period, callback=self.trend_chart.set_trend)
+        self.data.request('busiest', 'get_busiest_days', first_day, last_day, 5, callback=self.show_busiest_days)
+        
+    def show_busiest_days(self, days):
+        self.busiest_label.setText("Busiest days: " + ", ".join(
+            f"{QDate.fromString(date, Qt.DateFormat.ISODate).toString('MMM d')} ({count:,})"
+            for date, count, _ in days) if days else "No events this year")
+        
+    def show_heatmap_day(self, date):
+        self.calendar_stack.setCurrentIndex(0)
+        self.view_button.setText("Year")
+        self.go_to_date(date)
+        
+    def go_to_date(self, date):
+        # Shows date's month with only date selected
+        self.calendar.setSelectedDate(date)
+        previous = self.calendar.selected_dates
+        self.calendar.selected_dates = {date.toJulianDay()}
+        self.calendar.update_dates(previous ^ self.calendar.selected_dates)
+        self.update_events()
+
+    def refresh_dates(self, dates):
+        # After a write only the touched days are summarised again and merged into the grid,
+        # so just their cells repaint. Other cached months holding them are dropped.
+        dates = sorted(dates)
+        self.month_cache.invalidate_dates(dates)
+        year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        generation = self.month_cache.generation
+        
+        def loaded(summaries):
+            if (self.calendar.yearShown(), self.calendar.monthShown()) != (year, month):
+                return
+            self.calendar.merge_event_dates(dates, summaries)
+            self.month_cache.put(year, month, self.calendar.event_dates, generation)
             
-            QCalendarWidget QToolButton::menu-indicator { 
-                image: none;
-            }
-        """)
-        
-        self.events_list.setStyleSheet("""
-            QListWidget {
-                background-color: #252525;
-                border: 1px solid #333;
-                border-radius: 4px;
-                color: white;
-                font-size: 14px;
-                padding: 5px;
-            }
-            QListWidget::item {
-                padding: 5px;
-                margin: 2px 0;
-            }
-            QListWidget::item:selected {
-                background-color: #ed1c24;
-                color: white;
-            }
-        """)
-        
-        input_style = """
-            QLineEdit {
-                padding: 8px;
-                background-color: #252525;
-                border: 1px solid #333;
-                border-radius: 4px;
-                color: white;
-                font-size: 14px;
-                margin: 5px 0;
-            }
-            QLineEdit:focus {
-                border: 1px solid #ed1c24;
-            }
-            QLineEdit::placeholder {
-                color: #808080;
-            }
-        """
-        self.title_input.setStyleSheet(input_style)
-        self.time_input.setStyleSheet(input_style)
-        
-        self.add_button.setStyleSheet("""
-            QPushButton {
-                background-color: #ed1c24;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 10px 20px;
-                font-weight: bold;
-                margin: 5px;
-            }
-            QPushButton:hover {
-                background-color: #ff2c35;
-            }
-            QPushButton:pressed {
-                background-color: #d31820;
-            }
-        """)
-        
-        self.delete_button.setStyleSheet("""
-            QPushButton {
-                background-color: #404040;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 10px 20px;
-                font-weight: bold;
-                margin: 5px;
-            }
-            QPushButton:hover {
-                background-color: #4a4a4a;
-            }
-            QPushButton:pressed {
-                background-color: #363636;
-            }
-        """)
+        self.data.request(None, 'get_date_summaries', dates, callback=loaded)
+        self.refresh_year_view()
+        self.reminders.refresh_days(dates)
 
     def on_month_changed(self):
-        self.calendar.update_event_dates()
-        self.calendar.updateCells()
+        self.refresh_calendar()
+        self.refresh_search_dates()
+        
+    def search_query(self):
+        return fts_query(self.search_input.text()) or None
+        
+    def run_search(self):
+        if self.search_query() is None:
+            self.data.cancel('search_grid')
+            self.calendar.set_search_dates(set())
+        self.update_events()
+        
+    def refresh_search_dates(self):
+        query = self.search_query()
+        if query is None:
+            return
+        start_day, end_day = self.calendar.grid_range()
+        self.data.request('search_grid', 'search_dates', query, start_day, end_day,
+                          callback=self.calendar.set_search_dates)
+        
+    def show_search_result(self, index):
+        if self.events_model.query is None:
+            return
+        # Jump to the day of the match and leave search mode
+        date = QDate.fromJulianDay(index.data(EVENT_DATE_ROLE))
+        self.search_input.clear()
+        self.search_timer.stop()
+        self.calendar.set_search_dates(set())
+        self.go_to_date(date)
 
     def validate_time_format(self, time_str):
         try:
@@ -727,37 +1352,22 @@ class ModernCalendar(QMainWindow):
             
     def delete_event(self):
         try:
-            current_item = self.events_list.currentItem()
-            if not current_item:
+            current_index = self.events_list.currentIndex()
+            if not current_index.isValid():
                 return
                 
-            text = current_item.text()
+            date = current_index.data(EVENT_DATE_ROLE)
             
-            if ' - ' in text:
-                if '[' in text:
-                    # Has time and tag
-                    main_part = text.split(' [')[0]
-                    time = main_part.split(' - ')[0]
-                    description = main_part.split(' - ')[1]
-                else:
-                    # Has time, no tag
-                    time = text.split(' - ')[0]
-                    description = text.split(' - ')[1]
+            # Deleting one occurrence of a repeating event only cancels that day
+            event_id = current_index.data(EVENT_ID_ROLE)
+            recurrence_id = current_index.data(RECURRENCE_ID_ROLE)
+            calendar = current_index.data(CALENDAR_ROLE)
+            if recurrence_id is not None:
+                self.data.request(None, 'cancel_occurrence', recurrence_id, date, calendar)
             else:
-                if '[' in text:
-                    # No time, has tag
-                    description = text.split(' [')[0]
-                    time = None
-                else:
-                    # Only description
-                    description = text
-                    time = None
-            
-            date = self.calendar.selectedDate().toPyDate().isoformat()
-            self.db.delete_event(date, description, time)
+                self.data.request(None, 'delete_event_by_id', event_id, calendar)
             
-            self.calendar.update_event_dates()
-            self.calendar.updateCells()
+            self.refresh_dates([date])
             self.update_events()
             
         except Exception as e:
@@ -766,62 +1376,205 @@ class ModernCalendar(QMainWindow):
     def add_event(self):
         try:
             time = self.time_input.text().strip()
+            end_time = self.end_time_input.text().strip()
             description = self.title_input.text().strip()
             tag = self.tag_combo.currentText() if self.tag_combo.currentText() != 'No Tag' else None
+            rrule = REPEAT_RULES[self.repeat_combo.currentText()]
             
             if not description:
                 return
 
-            # Validate time if inputted
+            # Validate times if inputted
             if time and not self.validate_time_format(time):
                 return
+            if end_time and not self.validate_time_format(end_time):
+                return
 
             # If time is empty string, set to None
             time = time if time else None
+            end_time = end_time if end_time else None
+            try:
+                event_times(time, end_time)
+            except ValueError as e:
+                self.statusBar().showMessage(str(e), 5000)
+                return
             
             # Add event to all selected dates
-            selected_dates = self.calendar.selected_dates
+            selected_dates = set(self.calendar.selected_dates)
             if not selected_dates:  # If no dates selected, use current date
-                selected_dates = {self.calendar.selectedDate().toPyDate().isoformat()}
-            
-            for date in selected_dates:
-                self.db.add_event(date, description, time, tag)
-            
-            self.title_input.clear()
-            self.time_input.clear()
-            self.calendar.clear_selection()
+                selected_dates = {self.calendar.selectedDate().toJulianDay()}
             
-            self.calendar.update_event_dates()
-            self.calendar.updateCells()
-            self.update_events()
+            save = partial(self.save_event, selected_dates, description, time, end_time, tag, rrule)
+            if time is None:
+                save()
+                return
+            # Double bookings are looked up on the data worker, saving waits for the answer.
+            # A repeating event is checked on its first dates only.
+            self.data.request('conflicts', 'find_conflicts', sorted(selected_dates), time, end_time,
+                              callback=lambda conflicts: self.confirm_conflicts(conflicts, save))
             
         except Exception as e:
             print(f"Error: {str(e)}")
 
+    def confirm_conflicts(self, conflicts, save):
+        if conflicts:
+            shown = [f"{date}  {start}-{end}  {description}" for date, start, end, description, _ in conflicts[:10]]
+            if len(conflicts) > 10:
+                shown.append(f"and {len(conflicts) - 10:,} more")
+            answer = QMessageBox.question(self, "Double booking",
+                                          "This overlaps:\n\n" + "\n".join(shown) + "\n\nAdd it anyway?")
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+        save()
+
+    def save_event(self, dates, description, time, end_time, tag, rrule):
+        if rrule:
+            self.data.request(None, 'add_recurrences', sorted(dates), rrule, description, time, tag, end_time,
+                              self.target_calendar())
+            # A series can reach any later month
+            self.month_cache.clear()
+            self.refresh_calendar()
+            self.refresh_year_view()
+            self.reminders.reload()
+        else:
+            self.data.request(None, 'add_events', sorted(dates), description, time, tag, end_time,
+                              self.target_calendar())
+            self.refresh_dates(dates)
+        
+        self.title_input.clear()
+        self.time_input.clear()
+        self.end_time_input.clear()
+        self.calendar.clear_selection()
+        
+        self.update_events()
+
+    def find_free_time(self):
+        # Fills in the first stretch free on every selected date, as long as the times already
+        # entered or an hour. Only events with an end time take up time.
+        duration = 60
+        try:
+            start, end = event_times(self.time_input.text().strip() or None, self.end_time_input.text().strip() or None)
+            if end is not None:
+                duration = end - start
+        except ValueError:
+            pass
+        dates = self.calendar.selected_dates or {self.calendar.selectedDate().toJulianDay()}
+        self.data.request('free_time', 'find_common_slots', sorted(dates), duration,
+                          callback=lambda slots: self.show_free_time(slots, duration))
+
+    def show_free_time(self, slots, duration):
+        if not slots:
+            self.statusBar().showMessage("No free time on the selected dates", 5000)
+            return
+        start = minutes(slots[0][0])
+        self.time_input.setText(clock(start))
+        self.end_time_input.setText(clock(start + duration))
+
     def clear_selection(self):
         self.calendar.clear_selection()
 
+    def import_calendar(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import calendar", "", "iCalendar files (*.ics)")
+        if not path:
+            return
+        
+        # Runs on the bulk worker, progress arrives as queued signals so the window stays live
+        # and reads carry on. Events go into the calendar chosen for new events. The load is
+        # one transaction, a write queued behind it would hold up the data worker, so adding
+        # and deleting wait for it.
+        self.import_button.setEnabled(False)
+        self.add_button.setEnabled(False)
+        self.delete_button.setEnabled(False)
+        self.statusBar().showMessage("Importing...")
+        self.data.request(None, in_calendar(self.target_calendar(), ical.import_ics), path, bulk=True,
+                          callback=self.import_finished,
+                          progress=lambda done: self.statusBar().showMessage(f"Imported {done:,} events..."),
+                          error=self.import_failed)
+        
+    def import_failed(self, message):
+        self.add_button.setEnabled(True)
+        self.delete_button.setEnabled(True)
+        self.transfer_failed(self.import_button, message)
+        
+    def export_calendar(self):
+        # The month shown is offered as the range, the whole calendar goes out unless it is ticked
+        year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        first_date = QDate(year, month, 1)
+        options = ExportOptionsDialog(first_date, first_date.addMonths(1).addDays(-1), self)
+        if options.exec() != QDialog.DialogCode.Accepted:
+            return
+        start, end, tag = options.filters()
+        if start and end < start:
+            self.statusBar().showMessage("The export range ends before it starts", 5000)
+            return
+        
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export calendar", "calendar.ics",
+            "iCalendar files (*.ics);;CSV files (*.csv);;JSON Lines files (*.jsonl)")
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += '.' + selected_filter.split('*.')[-1].rstrip(')')
+        
+        self.export_button.setEnabled(False)
+        self.statusBar().showMessage("Exporting...")
+        # On the bulk worker like imports, a long export leaves the data worker free for reads
+        self.data.request(None, in_calendar(self.target_calendar(), export.export_events), path, None,
+                          start, end, tag, bulk=True,
+                          callback=lambda count: self.export_finished(path, count),
+                          progress=lambda done: self.statusBar().showMessage(f"Exported {done:,} events..."),
+                          error=lambda message: self.transfer_failed(self.export_button, message))
+        
+    def export_finished(self, path, count):
+        self.export_button.setEnabled(True)
+        self.statusBar().showMessage(f"Exported {count:,} events to {os.path.basename(path)}", 5000)
+        
+    def transfer_failed(self, button, message):
+        button.setEnabled(True)
+        self.statusBar().showMessage(f"Failed: {message}", 10000)
+        
+    def import_finished(self, count):
+        self.import_button.setEnabled(True)
+        self.add_button.setEnabled(True)
+        self.delete_button.setEnabled(True)
+        self.statusBar().showMessage(f"Imported {count:,} events", 5000)
+        self.month_cache.clear()
+        self.refresh_calendar()
+        self.refresh_year_view()
+        self.reminders.reload()
+        self.update_events()
+
     def update_events(self):
-        try:
-            self.events_list.clear()
-            date = self.calendar.selectedDate().toPyDate().isoformat()
+        # Timed here rather than decorated, the wrapper's *args would take the clicked date
+        started = time.perf_counter()
+        query = self.search_query()
+        if query is not None:
+            self.events_model.load_search(query)
+            self.refresh_search_dates()
+        else:
+            self.events_model.load_date(self.calendar.selectedDate().toJulianDay())
+        if instrumentation.enabled:
+            instrumentation.record('events.update_events', (time.perf_counter() - started) * 1000)
             
-            events = self.db.get_events(date)
-            for event in events:
-                time, description, tag = event
-                if time and tag:
-                    item_text = f"{time} - {description} [{tag}]"
-                elif time:
-                    item_text = f"{time} - {description}"
-                elif tag:
-                    item_text = f"{description} [{tag}]"
-                else:
-                    item_text = description
-                self.events_list.addItem(item_text)
-                
-        except Exception as e:
-            print(f"Error: {str(e)}")
+    def show_reminder(self, reminder):
+        # A tray notification where the desktop has a tray, the status bar and a taskbar alert otherwise
+        text = format_reminder(reminder)
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            if self.tray is None:
+                icon = self.windowIcon()
+                if icon.isNull():
+                    icon = self.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxInformation)
+                self.tray = QSystemTrayIcon(icon, self)
+                self.tray.show()
+            self.tray.showMessage("Reminder", text)
+        else:
+            self.statusBar().showMessage(f"Reminder: {text}", 60000)
+            QApplication.alert(self)
             
     def closeEvent(self, event):
+        self.reminders.stop()
+        self.data.close()
         self.db.close()
+        if instrumentation.enabled:
+            instrumentation.dump()
         event.accept()
\ No newline at end of file
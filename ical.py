@@ -0,0 +1,296 @@
+from datetime import date, datetime, timezone
+
+from database import clock, minutes
+from recurrence import RecurrenceRule
+
+KNOWN_TAGS = {tag.lower(): tag for tag in ['Work', 'Personal', 'School', 'Family', 'Travel']}
+
+
+def unfold_lines(stream):
+    # RFC 5545 folds long lines, a line starting with a space or tab continues the previous one
+    current = None
+    for line in stream:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t'):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_property(line):
+    # NAME;PARAM=VALUE;...:VALUE, a colon inside a quoted parameter doesn't end the name part
+    colon = line.find(':')
+    if colon == -1:
+        return None, {}, ''
+    quote = line.find('"')
+    if quote == -1 or quote > colon:
+        head, value = line[:colon], line[colon + 1:]
+    else:
+        in_quotes = False
+        for index, char in enumerate(line):
+            if char == '"':
+                in_quotes = not in_quotes
+            elif char == ':' and not in_quotes:
+                head, value = line[:index], line[index + 1:]
+                break
+        else:
+            return None, {}, ''
+
+    if ';' not in head:
+        return head.upper(), {}, value
+
+    name, *params = head.split(';')
+    parameters = {}
+    for param in params:
+        key, _, param_value = param.partition('=')
+        parameters[key.upper()] = param_value.strip('"')
+    return name.upper(), parameters, value
+
+
+def unescape_text(value):
+    if '\\' not in value:
+        return value
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, '')
+            result.append('\n' if escaped in ('n', 'N') else escaped)
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def iter_vevents(stream):
+    # Yields one {NAME: [(params, value), ...]} dict per VEVENT, nested components are skipped
+    event = None
+    depth = 0
+    for line in unfold_lines(stream):
+        name, params, value = parse_property(line)
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT' and event is None:
+                event = {}
+            elif event is not None:
+                depth += 1
+        elif name == 'END':
+            if depth:
+                depth -= 1
+            elif value.upper() == 'VEVENT' and event is not None:
+                yield event
+                event = None
+        elif event is not None and not depth and name:
+            event.setdefault(name, []).append((params, value))
+
+
+def parse_datetime(params, value):
+    # Returns (date, time) as ISO strings, time is None for all-day values
+    value = value.strip()
+    # Checked here so one bad value skips its event instead of failing the whole load
+    day = date.fromisoformat(f"{value[:4]}-{value[4:6]}-{value[6:8]}").isoformat()
+    if params.get('VALUE', '').upper() == 'DATE' or 'T' not in value:
+        return day, None
+
+    if not value.endswith('Z'):
+        # TZID and floating times keep their wall clock time
+        if (len(value) < 13 or value[8] != 'T' or not value[9:13].isdigit()
+                or int(value[9:11]) > 23 or int(value[11:13]) > 59):
+            raise ValueError(f"Invalid date-time: {value}")
+        return day, f"{value[9:11]}:{value[11:13]}"
+
+    # UTC times are shown in local time
+    moment = datetime.strptime(value[:15], '%Y%m%dT%H%M%S').replace(tzinfo=timezone.utc).astimezone()
+    return moment.date().isoformat(), moment.strftime('%H:%M')
+
+
+def _first(event, name):
+    values = event.get(name)
+    return values[0] if values else None
+
+
+def event_fields(event):
+    # Maps a VEVENT to (date, time, description, tag, end_time), None if it has no usable start
+    start = _first(event, 'DTSTART')
+    if not start:
+        return None
+    try:
+        date, time = parse_datetime(*start)
+    except ValueError:
+        return None
+
+    # Only an end later the same day is kept, the calendar has no multi-day events
+    end_time = None
+    end = _first(event, 'DTEND')
+    if end and time:
+        try:
+            end_date, end_time = parse_datetime(*end)
+        except ValueError:
+            end_date = None
+        if end_date != date or not end_time or end_time <= time:
+            end_time = None
+
+    summary = _first(event, 'SUMMARY')
+    description = unescape_text(summary[1]).strip() if summary else ''
+
+    tag = None
+    categories = _first(event, 'CATEGORIES')
+    if categories:
+        category = unescape_text(categories[1].split(',')[0]).strip()
+        tag = KNOWN_TAGS.get(category.lower(), category) or None
+
+    return date, time, description or '(No title)', tag, end_time
+
+
+def import_ics(db, path, batch_size=10000, progress=None):
+    # Single events stream straight into one bulk transaction. Repeating series, their
+    # EXDATEs and RECURRENCE-ID overrides are few, so they are kept aside and applied after.
+    series = []
+    overrides = []
+
+    def single_events(stream):
+        for event in iter_vevents(stream):
+            fields = event_fields(event)
+            if fields is None:
+                continue
+            uid = _first(event, 'UID')
+            uid = uid[1] if uid else None
+            rrule = _first(event, 'RRULE')
+            recurrence_id = _first(event, 'RECURRENCE-ID')
+
+            if rrule:
+                try:
+                    rule = RecurrenceRule.parse(rrule[1])
+                except ValueError:
+                    # Rules we can't expand keep their first occurrence
+                    yield fields
+                    continue
+                excluded = []
+                for params, value in event.get('EXDATE', []):
+                    for part in value.split(','):
+                        try:
+                            excluded.append(parse_datetime(params, part)[0])
+                        except ValueError:
+                            pass
+                series.append((uid, fields, str(rule), excluded))
+            elif recurrence_id and uid:
+                try:
+                    original_date = parse_datetime(*recurrence_id)[0]
+                except ValueError:
+                    yield fields
+                    continue
+                overrides.append((uid, original_date, fields))
+            else:
+                yield fields
+
+    with open(path, encoding='utf-8', errors='replace', newline='') as stream:
+        count = db.bulk_load(single_events(stream), batch_size, progress)
+
+    series_ids = {}
+    for uid, (date, time, description, tag, end_time), rrule, excluded in series:
+        recurrence_id = db.add_recurrence(date, rrule, description, time, tag, end_time)
+        if uid:
+            series_ids[uid] = recurrence_id
+        for excluded_date in excluded:
+            db.cancel_occurrence(recurrence_id, excluded_date)
+    count += len(series)
+
+    for uid, original_date, (date, time, description, tag, end_time) in overrides:
+        recurrence_id = series_ids.get(uid)
+        if recurrence_id is not None and date == original_date:
+            db.override_occurrence(recurrence_id, date, time, description, tag)
+            continue
+        # A moved occurrence becomes a cancelled one plus a single event on the new day
+        if recurrence_id is not None:
+            db.cancel_occurrence(recurrence_id, original_date)
+        db.add_event(date, description, time, tag, end_time)
+        count += 1
+
+    if progress:
+        progress(count)
+    return count
+
+
+def escape_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold_line(line):
+    # Lines are limited to 75 octets, continuations start with a single space
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split inside a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_start(date, time):
+    compact = date.replace('-', '')
+    if time:
+        return f"DTSTART:{compact}T{time.replace(':', '')}00"
+    return f"DTSTART;VALUE=DATE:{compact}"
+
+
+def _shifted_end(time, end_time, new_time):
+    # End of an occurrence moved to new_time, keeping the series' duration within the day
+    if not end_time or not new_time:
+        return end_time
+    end = min(minutes(new_time) + minutes(end_time) - minutes(time), 1439)
+    return clock(end) if end > minutes(new_time) else None
+
+
+def _vevent(uid, stamp, date, time, description, tag, extra=(), end_time=None):
+    lines = ['BEGIN:VEVENT', f"UID:{uid}", f"DTSTAMP:{stamp}", format_start(date, time)]
+    if end_time:
+        lines.append(format_start(date, end_time).replace('DTSTART', 'DTEND', 1))
+    lines.extend(extra)
+    lines.append(f"SUMMARY:{escape_text(description)}")
+    if tag:
+        lines.append(f"CATEGORIES:{escape_text(tag)}")
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+def write_ics(stream, events, recurrences=(), progress=None, progress_every=10000):
+    # events are (id, date, time, description, tag, end_time) rows, written as they arrive
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    stream.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Event Calendar//EN\r\n')
+
+    count = 0
+    for event_id, date, time, description, tag, end_time in events:
+        stream.write(_vevent(f"event-{event_id}@event-calendar", stamp, date, time, description, tag,
+                             end_time=end_time))
+        count += 1
+        if progress and count % progress_every == 0:
+            progress(count)
+
+    for recurrence_id, start_date, rrule, time, description, tag, exceptions, end_time in recurrences:
+        uid = f"series-{recurrence_id}@event-calendar"
+        extra = [f"RRULE:{rrule}"]
+        for date, cancelled, _, _, _ in exceptions:
+            if cancelled:
+                extra.append(format_start(date, time).replace('DTSTART', 'EXDATE', 1))
+        stream.write(_vevent(uid, stamp, start_date, time, description, tag, extra, end_time))
+
+        for date, cancelled, new_time, new_description, new_tag in exceptions:
+            if not cancelled:
+                original = format_start(date, time).replace('DTSTART', 'RECURRENCE-ID', 1)
+                stream.write(_vevent(uid, stamp, date, new_time or time, new_description or description,
+                                     new_tag or tag, [original], _shifted_end(time, end_time, new_time)))
+        count += 1
+
+    stream.write('END:VCALENDAR\r\n')
+    return count
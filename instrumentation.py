@@ -0,0 +1,155 @@
+import bisect
+import inspect
+import os
+import threading
+import time
+from functools import wraps
+
+DEFAULT_DUMP_PATH = 'calendar_profile.json'
+DEFAULT_SLOW_MS = 50.0
+
+# Log-spaced bucket upper bounds from 10 us to about 6.5 s, so memory stays constant
+BUCKET_BOUNDS = [0.01 * 1.25 ** i for i in range(61)]
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, elapsed_ms, rows=None):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows is not None:
+            self.rows += rows
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the sample, within 25% of the true value
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(BUCKET_BOUNDS[index], self.max_ms) if index < len(BUCKET_BOUNDS) else self.max_ms
+        return 0.0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 4) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50), 4),
+            'p95_ms': round(self.percentile(0.95), 4),
+            'p99_ms': round(self.percentile(0.99), 4),
+            'max_ms': round(self.max_ms, 4),
+            'rows': self.rows,
+        }
+
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = DEFAULT_SLOW_MS
+        self.dump_path = None
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self, dump_path=DEFAULT_DUMP_PATH, slow_ms=None):
+        self.enabled = True
+        self.dump_path = dump_path
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+
+    def configure_from_env(self):
+        # CALENDAR_PROFILE=1 dumps to the default file, any other value is the dump path
+        value = os.environ.get('CALENDAR_PROFILE')
+        if value:
+            slow_ms = os.environ.get('CALENDAR_SLOW_MS')
+            self.enable(DEFAULT_DUMP_PATH if value == '1' else value,
+                        float(slow_ms) if slow_ms else None)
+
+    def record(self, name, elapsed_ms, rows=None, args=None, log_slow=True):
+        # log_slow=False for figures that aren't call durations, like times since startup
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.add(elapsed_ms, rows)
+        if log_slow and elapsed_ms >= self.slow_ms:
+            details = f", args={args!r}" if args is not None else ""
+            print(f"Slow call: {name} took {elapsed_ms:.1f} ms{details}")
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + amount
+
+    def timed(self, name):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                self.record(name, (time.perf_counter() - start) * 1000, _row_count(result), args[1:])
+                return result
+            return wrapper
+        return decorator
+
+    def summary(self):
+        with self._lock:
+            return {
+                'latency': {name: histogram.summary() for name, histogram in sorted(self._histograms.items())},
+                'counters': dict(sorted(self._counters.items())),
+            }
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        if not path:
+            return
+        # Imported here, only profiling runs write a dump and the CLI starts faster without them
+        import csv
+        import json
+
+        summary = self.summary()
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['name', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'rows'])
+                for name, stats in summary['latency'].items():
+                    writer.writerow([name] + list(stats.values()))
+                for name, value in summary['counters'].items():
+                    writer.writerow([name, value, '', '', '', '', '', ''])
+        else:
+            with open(path, 'w') as f:
+                json.dump(summary, f, indent=2)
+
+
+def instrument_methods(prefix, exclude=()):
+    # Class decorator timing every public method under "<prefix>.<method>", except those named
+    # in exclude. Generators are left alone, the call only creates them and the work happens
+    # as they are iterated.
+    def decorator(cls):
+        for name, value in list(vars(cls).items()):
+            if (callable(value) and not name.startswith('_') and name not in exclude
+                    and not inspect.isgeneratorfunction(value)):
+                setattr(cls, name, instrumentation.timed(f"{prefix}.{name}")(value))
+        return cls
+    return decorator
+
+
+def _row_count(result):
+    if isinstance(result, (list, dict)):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    return None
+
+
+instrumentation = Instrumentation()
@@ -1,10 +1,54 @@
+import time
+# Taken before the Qt imports so the startup report covers them
+STARTED = time.perf_counter()
+
+import argparse
+import os
 import sys
-from gui import ModernCalendar
+from calendars import CalendarSet
+from database import (DEFAULT_BUSY_TIMEOUT_MS, DEFAULT_JOURNAL_MODE, DEFAULT_SYNCHRONOUS, JOURNAL_MODES,
+                      SYNCHRONOUS_LEVELS)
+from gui import ModernCalendar, StartupTimer, saved_calendars
+from instrumentation import DEFAULT_DUMP_PATH, instrumentation
 from PyQt6.QtWidgets import QApplication
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Event Calendar")
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_DUMP_PATH, metavar='PATH',
+                        help="Record query and paint timings and dump them to PATH (.json or .csv)")
+    parser.add_argument('--slow-ms', type=float, help="Log calls slower than this many milliseconds")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="Print the time to first paint and to the first month's data")
+    parser.add_argument('--busy-timeout', type=int, default=DEFAULT_BUSY_TIMEOUT_MS, metavar='MS',
+                        help="How long to wait for another process holding the database lock")
+    parser.add_argument('--synchronous', choices=SYNCHRONOUS_LEVELS, default=DEFAULT_SYNCHRONOUS,
+                        type=str.upper, help="SQLite synchronous level, under WAL NORMAL can lose the last commits on power loss")
+    parser.add_argument('--journal-mode', choices=JOURNAL_MODES, default=DEFAULT_JOURNAL_MODE, type=str.upper,
+                        help="SQLite journal mode, DELETE for a calendar on a network share where WAL doesn't work")
+    parser.add_argument('--calendar', action='append', default=[], metavar='PATH',
+                        help="Also show this calendar file, can be given more than once")
+    # Leave Qt's own options (-style, -platform...) for QApplication
+    return parser.parse_known_args()
+
 def main():
-    app = QApplication(sys.argv)
-    window = ModernCalendar()
+    args, qt_args = parse_args()
+    instrumentation.configure_from_env()
+    if args.profile:
+        instrumentation.enable(args.profile, args.slow_ms)
+    
+    app = QApplication(sys.argv[:1] + qt_args)
+    # calendar.db first, then the ones given here and those added in earlier sessions
+    paths, hidden = saved_calendars()
+    db = CalendarSet(['calendar.db'] + args.calendar + paths, busy_timeout_ms=args.busy_timeout,
+                     synchronous=args.synchronous, journal_mode=args.journal_mode)
+    for name in db.names():
+        if os.path.abspath(db.path(name)) in hidden:
+            try:
+                db.set_visible(name, False)
+            except ValueError:
+                pass
+    startup = StartupTimer(STARTED, args.startup_report) if args.startup_report or instrumentation.enabled else None
+    window = ModernCalendar(db=db, startup=startup)
     sys.exit(app.exec())
 
 if __name__ == '__main__':
@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+
+class RecurrenceRule:
+    FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+
+    def __init__(self, freq, interval=1, byday=None, count=None, until=None):
+        if freq not in self.FREQUENCIES:
+            raise ValueError(f"Unsupported frequency: {freq}")
+        if interval < 1:
+            raise ValueError(f"Invalid interval: {interval}")
+        if byday and freq != 'WEEKLY':
+            raise ValueError("BYDAY is only supported for weekly rules")
+        self.freq = freq
+        self.interval = interval
+        self.byday = sorted(set(byday)) if byday else None
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, text):
+        # Subset of RFC 5545 RRULE: FREQ, INTERVAL, BYDAY (weekly), COUNT and UNTIL
+        parts = {}
+        for part in text.upper().split(';'):
+            if part:
+                key, _, value = part.partition('=')
+                parts[key] = value
+
+        unknown = set(parts) - {'FREQ', 'INTERVAL', 'BYDAY', 'COUNT', 'UNTIL'}
+        if unknown:
+            raise ValueError(f"Unsupported RRULE parts: {', '.join(sorted(unknown))}")
+
+        byday = None
+        if 'BYDAY' in parts:
+            try:
+                byday = [WEEKDAYS.index(day) for day in parts['BYDAY'].split(',')]
+            except ValueError:
+                raise ValueError(f"Invalid BYDAY: {parts['BYDAY']}")
+
+        until = None
+        if 'UNTIL' in parts:
+            value = parts['UNTIL']
+            until = date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+        return cls(parts.get('FREQ'),
+                   interval=int(parts.get('INTERVAL', 1)),
+                   byday=byday,
+                   count=int(parts['COUNT']) if 'COUNT' in parts else None,
+                   until=until)
+
+    def __str__(self):
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.byday:
+            parts.append("BYDAY=" + ','.join(WEEKDAYS[day] for day in self.byday))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%d')}")
+        return ';'.join(parts)
+
+    def last_date(self, start):
+        # Last possible occurrence of a series starting on start, None if it never ends
+        if self.count is None:
+            return self.until
+        last = None
+        for index, day in enumerate(self.between(start, start, self.until or date.max)):
+            last = day
+            if index + 1 == self.count:
+                break
+        return last
+
+    def between(self, start, window_start, window_end):
+        # Work is proportional to the window, never to how long the series has been running
+        if self.until:
+            window_end = min(window_end, self.until)
+        window_start = max(window_start, start)
+        if window_start > window_end:
+            return
+
+        if self.freq == 'DAILY':
+            offset = _round_up((window_start - start).days, self.interval)
+            day = start + timedelta(days=offset)
+            while day <= window_end:
+                yield day
+                day += timedelta(days=self.interval)
+
+        elif self.freq == 'WEEKLY':
+            weekdays = self.byday or [start.weekday()]
+            first_monday = start - timedelta(days=start.weekday())
+            weeks = _round_up((window_start - first_monday).days // 7, self.interval)
+            monday = first_monday + timedelta(weeks=weeks)
+            while monday <= window_end:
+                for weekday in weekdays:
+                    day = monday + timedelta(days=weekday)
+                    if window_start <= day <= window_end:
+                        yield day
+                monday += timedelta(weeks=self.interval)
+
+        else:
+            step = self.interval if self.freq == 'MONTHLY' else self.interval * 12
+            months = (window_start.year - start.year) * 12 + window_start.month - start.month
+            months = _round_up(months, step)
+            while True:
+                year, month = divmod(start.month - 1 + months, 12)
+                year += start.year
+                month += 1
+                if year > window_end.year or (year == window_end.year and month > window_end.month):
+                    break
+                # Months without the start day (the 31st, Feb 29) are skipped, as in RFC 5545
+                try:
+                    day = date(year, month, start.day)
+                except ValueError:
+                    day = None
+                if day and window_start <= day <= window_end:
+                    yield day
+                months += step
+
+
+def _round_up(value, step):
+    return -(-value // step) * step
@@ -0,0 +1,110 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import date, datetime, timedelta
+
+from database import clock, day_date, day_number, iso_date
+
+DEFAULT_LEAD_MINUTES = 10
+# Today and tomorrow are held, so a reminder due just after midnight is never missed
+LOOKAHEAD_DAYS = 2
+# Monotonic timers stop while the machine sleeps, so a long wait wakes up hourly to catch up
+MAX_SLEEP_SECONDS = 3600
+# Headless only: how often to look for writes made by other processes
+CHANGE_CHECK_SECONDS = 60
+
+
+def starts_at(day, minute):
+    # Epoch seconds of a day number and minutes after midnight, in local time
+    return (datetime.combine(day_date(day), datetime.min.time()) + timedelta(minutes=minute)).timestamp()
+
+
+def format_reminder(reminder, now=None):
+    day, minute, description, tag = reminder
+    text = f"{clock(minute)}  {description}"
+    if tag:
+        text += f" [{tag}]"
+    if day != day_number(date.fromtimestamp(now or time.time())):
+        text = f"{iso_date(day)}  {text}"
+    return text
+
+
+class ReminderQueue:
+    # Reminders for the timed events of the next LOOKAHEAD_DAYS days in a heap ordered by due
+    # time, (due, order, (day, minute, description, tag)). Nothing here touches the database
+    # or a clock: callers load rows, pass the time in and sleep until next_wakeup().
+    def __init__(self, lead_minutes=DEFAULT_LEAD_MINUTES):
+        self.lead = lead_minutes * 60
+        self.first_day = self.last_day = None
+        self._heap = []
+        self._order = itertools.count()
+        # Reminders already given, so reloading a day within the lead time doesn't repeat them
+        self._fired = set()
+
+    def window(self, now):
+        first_day = day_number(date.fromtimestamp(now))
+        return first_day, first_day + LOOKAHEAD_DAYS - 1
+
+    def stale(self, now):
+        # The window moves on at midnight
+        return self.first_day != self.window(now)[0]
+
+    def load(self, first_day, last_day, rows, now):
+        self.first_day, self.last_day = first_day, last_day
+        self._heap = []
+        self._fired = {reminder for reminder in self._fired if reminder[0] >= first_day}
+        self.replace_days(range(first_day, last_day + 1), rows, now)
+
+    def replace_days(self, days, rows, now):
+        # rows are (day, minute, description, tag) for at least these days. Entries of the
+        # days are swapped out, the heap only holds a couple of days so a rebuild is cheap.
+        if self.first_day is None:
+            return
+        days = {day for day in days if self.first_day <= day <= self.last_day}
+        if not days:
+            return
+        self._heap = [entry for entry in self._heap if entry[2][0] not in days]
+        for day, minute, description, tag in rows:
+            start = starts_at(day, minute)
+            # Events that already started are not reminded of
+            if day in days and start > now and (day, minute, description, tag) not in self._fired:
+                self._heap.append((start - self.lead, next(self._order), (day, minute, description, tag)))
+        heapq.heapify(self._heap)
+
+    def pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            reminder = heapq.heappop(self._heap)[2]
+            self._fired.add(reminder)
+            due.append(reminder)
+        return due
+
+    def next_wakeup(self, now):
+        # Epoch seconds of the next reminder, capped by midnight and MAX_SLEEP_SECONDS
+        wakeup = min(starts_at(self.first_day + 1, 0), now + MAX_SLEEP_SECONDS)
+        if self._heap:
+            wakeup = min(wakeup, self._heap[0][0])
+        return wakeup
+
+
+async def remind(db, notify, lead_minutes=DEFAULT_LEAD_MINUTES):
+    # Headless scheduler: one sleep until the next wakeup. Writes by other processes are
+    # noticed through the database's data_version, which reads no table, every
+    # CHANGE_CHECK_SECONDS, and only then is the window loaded again.
+    reminders = ReminderQueue(lead_minutes)
+    version = None
+    while True:
+        now = time.time()
+        current = db.data_version()
+        if current != version or reminders.stale(now):
+            version = current
+            first_day, last_day = reminders.window(now)
+            reminders.load(first_day, last_day, db.get_timed_events(first_day, last_day), now)
+        for reminder in reminders.pop_due(now):
+            notify(format_reminder(reminder, now))
+        await asyncio.sleep(max(0, min(reminders.next_wakeup(now), now + CHANGE_CHECK_SECONDS) - time.time()))
+
+
+def run(db, notify=print, lead_minutes=DEFAULT_LEAD_MINUTES):
+    asyncio.run(remind(db, notify, lead_minutes))
@@ -0,0 +1,289 @@
+ACCENT = '#ed1c24'
+
+# The whole window is styled from this one sheet, set once on the application before any
+# widget exists, so Qt parses it a single time and polishes each widget once. Rules are
+# scoped by object name, leaving dialogs with the platform look.
+STYLESHEET = f"""
+QMainWindow#calendarWindow {{
+    background-color: #1a1a1a;
+}}
+
+#calendarWindow QStatusBar {{
+    color: white;
+}}
+
+/* Cards, also inherited by the frames inside them (labels, lists, popups) */
+QFrame#calendarCard, #calendarCard QFrame {{
+    background-color: #2d2d2d;
+    border-radius: 10px;
+}}
+
+QFrame#eventsCard, #eventsCard QFrame {{
+    background-color: #2d2d2d;
+    border-radius: 10px;
+    padding: 20px;
+}}
+
+/* Labels */
+QLabel#calendarHeader {{
+    color: white;
+    font-size: 24px;
+    font-weight: bold;
+    padding-bottom: 15px;
+}}
+
+QLabel#eventsHeader {{
+    color: white;
+    font-size: 24px;
+    font-weight: bold;
+    margin-bottom: 15px;
+}}
+
+QLabel#fieldLabel {{
+    color: white;
+    font-size: 14px;
+    padding: 0;
+    margin: 0;
+}}
+
+/* Calendar */
+#calendarCard QCalendarWidget {{
+    background-color: #1a1a1a;
+    border: none;
+}}
+
+#calendarCard QCalendarWidget QWidget {{
+    alternate-background-color: #1a1a1a;
+    color: white;
+}}
+
+#calendarCard QCalendarWidget QWidget#qt_calendar_navigationbar {{
+    background-color: #1a1a1a;
+    min-height: 50px;
+    border-top-left-radius: 8px;
+    border-top-right-radius: 8px;
+}}
+
+#calendarCard QCalendarWidget QToolButton {{
+    color: white;
+    font-size: 18px;
+    font-weight: bold;
+    background-color: transparent;
+    padding: 10px;
+}}
+
+#calendarCard QCalendarWidget QMenu {{
+    width: 150px;
+    left: 20px;
+    color: white;
+    background-color: #1a1a1a;
+    border: 1px solid #404040;
+}}
+
+#calendarCard QCalendarWidget QSpinBox {{
+    color: white;
+    background-color: #1a1a1a;
+    selection-background-color: {ACCENT};
+    selection-color: white;
+}}
+
+#calendarCard QCalendarWidget QTableView {{
+    background-color: #2f2f2f;
+    selection-background-color: {ACCENT};
+    selection-color: white;
+    border: none;
+    outline: none;
+}}
+
+#calendarCard QCalendarWidget QTableView QHeaderView::section {{
+    color: white;
+    padding: 6px;
+    background-color: #2f2f2f;
+    border: 1px solid #404040;
+}}
+
+#calendarCard QCalendarWidget QTableView::item {{
+    border: 1px solid #404040;
+    padding: 5px;
+}}
+
+#calendarCard QCalendarWidget QAbstractItemView:enabled {{
+    color: white;
+    selection-background-color: {ACCENT};
+    selection-color: white;
+}}
+
+#calendarCard QCalendarWidget QAbstractItemView:disabled {{
+    color: #666;
+}}
+
+#calendarCard QCalendarWidget QToolButton::menu-indicator {{
+    image: none;
+}}
+
+/* Year heatmap */
+QLabel#yearLabel {{
+    color: white;
+    font-size: 18px;
+    font-weight: bold;
+}}
+
+QToolButton#yearNavButton {{
+    background-color: transparent;
+    border: none;
+    padding: 10px;
+}}
+
+/* Events list */
+QListView#eventsList {{
+    background-color: #252525;
+    border: 1px solid #333;
+    border-radius: 4px;
+    color: white;
+    font-size: 14px;
+    padding: 5px;
+}}
+
+QListView#eventsList::item {{
+    padding: 5px;
+    margin: 2px 0;
+}}
+
+QListView#eventsList::item:selected {{
+    background-color: {ACCENT};
+    color: white;
+}}
+
+/* Inputs */
+QLineEdit#searchInput {{
+    padding: 8px;
+    background-color: #252525;
+    border: 1px solid #333;
+    border-radius: 4px;
+    color: white;
+    font-size: 14px;
+    margin-bottom: 8px;
+}}
+
+QLineEdit#searchInput:focus {{
+    border: 1px solid #ffd54f;
+}}
+
+QLineEdit#formInput {{
+    padding: 8px;
+    background-color: #252525;
+    border: 1px solid #333;
+    border-radius: 4px;
+    color: white;
+    font-size: 14px;
+    margin: 5px 0;
+}}
+
+QLineEdit#formInput:focus {{
+    border: 1px solid {ACCENT};
+}}
+
+#eventsCard QComboBox, #calendarCard QComboBox {{
+    padding: 8px;
+    background-color: #252525;
+    border: 1px solid #333;
+    border-radius: 4px;
+    color: white;
+    font-size: 14px;
+    margin: 0;
+}}
+
+#eventsCard QComboBox:drop-down, #calendarCard QComboBox:drop-down {{
+    border: none;
+}}
+
+#eventsCard QComboBox::down-arrow, #calendarCard QComboBox::down-arrow {{
+    image: none;
+    border-left: 4px solid transparent;
+    border-right: 4px solid transparent;
+    border-top: 6px solid #666;
+    margin-right: 8px;
+}}
+
+#eventsCard QComboBox QAbstractItemView, #calendarCard QComboBox QAbstractItemView {{
+    background-color: #252525;
+    color: white;
+    selection-background-color: {ACCENT};
+}}
+
+#calendarCard QMenu {{
+    background-color: #252525;
+    border: 1px solid #333;
+    color: white;
+    font-size: 14px;
+    padding: 4px;
+}}
+
+#calendarCard QMenu::item {{
+    padding: 6px 20px 6px 28px;
+}}
+
+#calendarCard QMenu::item:selected {{
+    background-color: {ACCENT};
+}}
+
+#calendarCard QMenu::separator {{
+    height: 1px;
+    background-color: #333;
+    margin: 4px 0;
+}}
+
+/* Buttons */
+QPushButton#addButton {{
+    background-color: {ACCENT};
+    color: white;
+    border: none;
+    border-radius: 4px;
+    padding: 10px 20px;
+    font-weight: bold;
+    margin: 5px;
+}}
+
+QPushButton#addButton:hover {{
+    background-color: #ff2c35;
+}}
+
+QPushButton#addButton:pressed {{
+    background-color: #d31820;
+}}
+
+QPushButton#deleteButton {{
+    background-color: #404040;
+    color: white;
+    border: none;
+    border-radius: 4px;
+    padding: 10px 20px;
+    font-weight: bold;
+    margin: 5px;
+}}
+
+QPushButton#deleteButton:hover {{
+    background-color: #4a4a4a;
+}}
+
+QPushButton#deleteButton:pressed {{
+    background-color: #363636;
+}}
+
+QPushButton#secondaryButton {{
+    background-color: #2d2d2d;
+    color: white;
+    border: 1px solid #404040;
+    border-radius: 4px;
+    padding: 10px 20px;
+    font-weight: bold;
+}}
+
+QPushButton#secondaryButton:hover {{
+    background-color: #363636;
+}}
+
+QPushButton#secondaryButton:pressed {{
+    background-color: #2a2a2a;
+}}
+"""